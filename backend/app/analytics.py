@@ -0,0 +1,161 @@
+import os
+import threading
+import time
+from sqlalchemy import func, and_, select, union_all
+from sqlalchemy.orm import Session
+from . import database
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# The cache lives in each worker and writes only invalidate the worker that
+# handled them, so with several workers analytics can lag by up to this long.
+ANALYTICS_CACHE_TTL_SECONDS = float(os.getenv("ANALYTICS_CACHE_TTL_SECONDS", "300"))
+# SQLite caps compound SELECTs at 500 terms
+MEDIAN_LESSONS_PER_QUERY = 200
+
+_cache = {}
+_generations = {}
+_cache_lock = threading.Lock()
+
+def invalidate_course_analytics(course_id: int):
+    with _cache_lock:
+        _cache.pop(course_id, None)
+        _generations[course_id] = _generations.get(course_id, 0) + 1
+
+def get_course_analytics(db: Session, course_id: int):
+    """Return cached analytics for a course, recomputing them if missing or expired."""
+    now = time.monotonic()
+    with _cache_lock:
+        cached = _cache.get(course_id)
+        generation = _generations.get(course_id, 0)
+    if cached and now - cached[0] < ANALYTICS_CACHE_TTL_SECONDS:
+        return cached[1]
+
+    analytics = compute_course_analytics(db, course_id)
+    with _cache_lock:
+        # Skip caching if progress was written while we were computing
+        if _generations.get(course_id, 0) == generation:
+            expired = [key for key, (cached_at, _) in _cache.items()
+                       if now - cached_at >= ANALYTICS_CACHE_TTL_SECONDS]
+            for key in expired:
+                del _cache[key]
+            _cache[course_id] = (now, analytics)
+    return analytics
+
+def compute_median_watched_durations(db: Session, course_id: int):
+    """Return {lesson_id: median watched_duration} for lessons with progress records.
+
+    Each median is read straight off the (lesson_id, watched_duration) index:
+    one grouped count per lesson, then an ORDER BY ... LIMIT/OFFSET seek for
+    the middle row(s), batched into UNION ALL statements.
+    """
+    counts = db.query(database.LessonProgress.lesson_id, func.count())\
+               .join(database.Lesson, database.Lesson.id == database.LessonProgress.lesson_id)\
+               .filter(database.Lesson.course_id == course_id)\
+               .group_by(database.LessonProgress.lesson_id).all()
+
+    medians = {}
+    for start in range(0, len(counts), MEDIAN_LESSONS_PER_QUERY):
+        middles = []
+        for lesson_id, total in counts[start:start + MEDIAN_LESSONS_PER_QUERY]:
+            middle = select(database.LessonProgress.lesson_id, database.LessonProgress.watched_duration)\
+                .where(database.LessonProgress.lesson_id == lesson_id)\
+                .order_by(database.LessonProgress.watched_duration)\
+                .offset((total - 1) // 2)\
+                .limit(2 - total % 2)\
+                .subquery()
+            middles.append(select(middle.c.lesson_id, middle.c.watched_duration))
+        rows = union_all(*middles).subquery()
+        medians.update(
+            db.query(rows.c.lesson_id, func.avg(rows.c.watched_duration))\
+              .group_by(rows.c.lesson_id).all()
+        )
+    return medians
+
+def compute_course_analytics(db: Session, course_id: int):
+    enrollment = database.user_course_association
+
+    total_students = db.query(func.count(enrollment.c.user_id))\
+                      .filter(enrollment.c.course_id == course_id).scalar() or 0
+
+    # Per-lesson completion counts in one grouped query
+    lessons = db.query(
+        database.Lesson.id,
+        database.Lesson.title,
+        database.Lesson.order_index,
+        func.count(database.LessonProgress.user_id.distinct())
+    )\
+    .outerjoin(database.LessonProgress, and_(
+        database.LessonProgress.lesson_id == database.Lesson.id,
+        database.LessonProgress.is_completed == True
+    ))\
+    .filter(database.Lesson.course_id == course_id)\
+    .group_by(database.Lesson.id, database.Lesson.title, database.Lesson.order_index)\
+    .order_by(database.Lesson.order_index, database.Lesson.id).all()
+
+    medians = compute_median_watched_durations(db, course_id)
+
+    # Completion funnel: how many students completed at least N lessons
+    completed_per_student = db.query(
+        func.count(database.LessonProgress.lesson_id.distinct()).label("completed")
+    )\
+    .join(database.Lesson, database.Lesson.id == database.LessonProgress.lesson_id)\
+    .filter(
+        database.Lesson.course_id == course_id,
+        database.LessonProgress.is_completed == True
+    )\
+    .group_by(database.LessonProgress.user_id).subquery()
+    students_by_completed = dict(
+        db.query(completed_per_student.c.completed, func.count())\
+          .group_by(completed_per_student.c.completed).all()
+    )
+
+    # Enrollments per day
+    enrolled_on = func.date(enrollment.c.enrolled_at)
+    enrollments_by_day = db.query(enrolled_on, func.count(enrollment.c.user_id))\
+                          .filter(
+                              enrollment.c.course_id == course_id,
+                              enrollment.c.enrolled_at != None
+                          )\
+                          .group_by(enrolled_on).order_by(enrolled_on).all()
+
+    lesson_stats = []
+    previous_completed = total_students
+    for lesson_id, title, order_index, completed in lessons:
+        median = medians.get(lesson_id)
+        lesson_stats.append({
+            "lesson_id": lesson_id,
+            "title": title,
+            "order_index": order_index,
+            "completed_count": completed,
+            "completion_rate": completed / total_students if total_students else 0.0,
+            "drop_off": max(previous_completed - completed, 0),
+            "median_watched_duration": float(median) if median is not None else None
+        })
+        previous_completed = completed
+
+    funnel = []
+    reached = 0
+    for completed in range(len(lessons), 0, -1):
+        reached += students_by_completed.get(completed, 0)
+        funnel.append({"lessons_completed": completed, "students": reached})
+    funnel.reverse()
+
+    enrollment_over_time = []
+    cumulative = 0
+    for day, enrollments in enrollments_by_day:
+        cumulative += enrollments
+        enrollment_over_time.append({
+            "day": day,
+            "enrollments": enrollments,
+            "cumulative_enrollments": cumulative
+        })
+
+    return {
+        "course_id": course_id,
+        "total_students": total_students,
+        "lessons": lesson_stats,
+        "funnel": funnel,
+        "enrollment_over_time": enrollment_over_time
+    }
@@ -1,9 +1,13 @@
 from datetime import datetime, timedelta
 from typing import Optional
+import hashlib
+import secrets
+import threading
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
+from sqlalchemy import or_
 from sqlalchemy.orm import Session
 from . import database, schemas
 import os
@@ -14,6 +18,7 @@ load_dotenv()
 SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-here-change-in-production")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
+REFRESH_TOKEN_EXPIRE_DAYS = 30
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/token")
@@ -48,6 +53,143 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
+# Hashes of refresh tokens rotated by this process, mapped to
+# (user_id, expiry, rotated_at), so a replayed token is recognised without a
+# lookup and still revokes the rest of its user's tokens. The database
+# remains the source of truth; entries are dropped once the token expires.
+_revoked_refresh_tokens = {}
+_revoked_refresh_tokens_lock = threading.Lock()
+MAX_REVOKED_REFRESH_TOKENS = 100000
+# Rotated tokens are kept this long so a replay can still be detected, then pruned
+REVOKED_REFRESH_TOKEN_RETENTION = timedelta(days=1)
+# A token reused this soon after its rotation is a concurrent refresh (e.g. a
+# second browser tab), not theft, and gets a new token instead
+REFRESH_TOKEN_REUSE_GRACE = timedelta(seconds=30)
+
+def hash_refresh_token(token: str):
+    return hashlib.sha256(token.encode()).hexdigest()
+
+def _remember_rotated_refresh_token(db_token: database.RefreshToken, rotated_at: datetime):
+    with _revoked_refresh_tokens_lock:
+        if len(_revoked_refresh_tokens) >= MAX_REVOKED_REFRESH_TOKENS:
+            now = datetime.utcnow()
+            for expired in [h for h, (_, exp, _) in _revoked_refresh_tokens.items() if exp <= now]:
+                del _revoked_refresh_tokens[expired]
+            if len(_revoked_refresh_tokens) >= MAX_REVOKED_REFRESH_TOKENS:
+                _revoked_refresh_tokens.clear()
+        _revoked_refresh_tokens[db_token.token_hash] = (db_token.user_id, db_token.expires_at, rotated_at)
+
+def _get_replayed_refresh_token_user(token_hash: str):
+    """Return the user id of a token this process rotated before the grace window, else None."""
+    with _revoked_refresh_tokens_lock:
+        entry = _revoked_refresh_tokens.get(token_hash)
+    now = datetime.utcnow()
+    if entry and entry[1] > now and now - entry[2] > REFRESH_TOKEN_REUSE_GRACE:
+        return entry[0]
+    return None
+
+def _add_refresh_token(db: Session, user: database.User):
+    token = secrets.token_urlsafe(32)
+    db_token = database.RefreshToken(
+        user_id=user.id,
+        token_hash=hash_refresh_token(token),
+        expires_at=datetime.utcnow() + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
+    )
+    db.add(db_token)
+    return token, db_token
+
+def create_refresh_token(db: Session, user: database.User):
+    """Create a refresh token for the user; only its hash is stored. Caller commits."""
+    token, _ = _add_refresh_token(db, user)
+    return token
+
+def prune_refresh_tokens(db: Session, user_id: Optional[int] = None):
+    """Delete expired refresh tokens and rotated ones past the reuse window. Caller commits."""
+    now = datetime.utcnow()
+    query = db.query(database.RefreshToken)\
+              .filter(or_(database.RefreshToken.expires_at <= now,
+                          database.RefreshToken.revoked_at <= now - REVOKED_REFRESH_TOKEN_RETENTION))
+    if user_id is not None:
+        query = query.filter(database.RefreshToken.user_id == user_id)
+    query.delete(synchronize_session=False)
+
+def prune_all_refresh_tokens():
+    """Prune stale refresh tokens of every user, including sessions that never refresh again."""
+    db = database.SessionLocal()
+    try:
+        prune_refresh_tokens(db)
+        db.commit()
+    finally:
+        db.close()
+
+def revoke_user_refresh_tokens(db: Session, user_id: int):
+    db.query(database.RefreshToken)\
+      .filter(database.RefreshToken.user_id == user_id,
+              database.RefreshToken.revoked_at == None)\
+      .update({database.RefreshToken.revoked_at: datetime.utcnow()}, synchronize_session=False)
+
+def rotate_refresh_token(db: Session, token: str):
+    """Exchange a refresh token for a new one.
+
+    Returns (user, new_token), or None if the token is unknown, expired,
+    logged out or already used. A rotated token presented again within
+    REFRESH_TOKEN_REUSE_GRACE is a concurrent refresh and gets its own new
+    token; after that it means the token was stolen or replayed, and every
+    refresh token of its user is revoked.
+    """
+    token_hash = hash_refresh_token(token)
+    replayed_user_id = _get_replayed_refresh_token_user(token_hash)
+    if replayed_user_id is not None:
+        revoke_user_refresh_tokens(db, replayed_user_id)
+        db.commit()
+        return None
+    
+    db_token = db.query(database.RefreshToken)\
+                .filter(database.RefreshToken.token_hash == token_hash).first()
+    now = datetime.utcnow()
+    if not db_token or db_token.expires_at <= now:
+        return None
+    
+    # Conditional update so only one of several concurrent refreshes rotates the token
+    rotated = db.query(database.RefreshToken)\
+               .filter(database.RefreshToken.id == db_token.id,
+                       database.RefreshToken.revoked_at == None)\
+               .update({database.RefreshToken.revoked_at: now},
+                       synchronize_session=False)
+    if not rotated:
+        db.refresh(db_token)
+        if db_token.replaced_by_id is None:
+            # Logged out, or revoked along with the rest of its family
+            db.rollback()
+            return None
+        if now - db_token.revoked_at > REFRESH_TOKEN_REUSE_GRACE:
+            revoke_user_refresh_tokens(db, db_token.user_id)
+            db.commit()
+            _remember_rotated_refresh_token(db_token, db_token.revoked_at)
+            return None
+    
+    user = db_token.user
+    if not user.is_active:
+        db.commit()
+        return None
+    
+    prune_refresh_tokens(db, user.id)
+    new_token, new_db_token = _add_refresh_token(db, user)
+    if rotated:
+        db.flush()
+        db_token.replaced_by_id = new_db_token.id
+    db.commit()
+    _remember_rotated_refresh_token(db_token, db_token.revoked_at)
+    return user, new_token
+
+def revoke_refresh_token(db: Session, token: str):
+    token_hash = hash_refresh_token(token)
+    db.query(database.RefreshToken)\
+      .filter(database.RefreshToken.token_hash == token_hash,
+              database.RefreshToken.revoked_at == None)\
+      .update({database.RefreshToken.revoked_at: datetime.utcnow()}, synchronize_session=False)
+    db.commit()
+
 async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(database.get_db)):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -0,0 +1,148 @@
+import asyncio
+import json
+import math
+import os
+from anyio import to_thread
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Per route class: how many requests may run at once, how many may wait for a
+# slot, and (shared) how long a request may wait before it is shed.
+READ_CONCURRENCY_LIMIT = int(os.getenv("READ_CONCURRENCY_LIMIT", "32"))
+READ_QUEUE_LIMIT = int(os.getenv("READ_QUEUE_LIMIT", "64"))
+WRITE_CONCURRENCY_LIMIT = int(os.getenv("WRITE_CONCURRENCY_LIMIT", "8"))
+WRITE_QUEUE_LIMIT = int(os.getenv("WRITE_QUEUE_LIMIT", "32"))
+AUTH_CONCURRENCY_LIMIT = int(os.getenv("AUTH_CONCURRENCY_LIMIT", "4"))
+AUTH_QUEUE_LIMIT = int(os.getenv("AUTH_QUEUE_LIMIT", "16"))
+REQUEST_QUEUE_TIMEOUT_SECONDS = float(os.getenv("REQUEST_QUEUE_TIMEOUT_SECONDS", "5"))
+
+EXEMPT_PATHS = {"/", "/health", "/health/load"}
+# Only routes that run bcrypt belong in the auth class; token refresh and logout are cheap writes
+AUTH_PATHS = {"/auth/token", "/auth/register"}
+
+class RouteClassLimiter:
+    """Admits up to max_concurrent requests and queues up to max_queue more."""
+
+    def __init__(self, name: str, max_concurrent: int, max_queue: int, queue_timeout: float):
+        self.name = name
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.active = 0
+        self.queued = 0
+        self.admitted = 0
+        self.rejected_queue_full = 0
+        self.rejected_timeout = 0
+        self._semaphore = None
+
+    async def acquire(self):
+        """Wait for a slot. Returns False if the request should be shed."""
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrent)
+
+        # Counters are updated before the first await, so this check can't be raced
+        if self.active + self.queued >= self.max_concurrent + self.max_queue:
+            self.rejected_queue_full += 1
+            return False
+
+        self.queued += 1
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), self.queue_timeout)
+        except asyncio.TimeoutError:
+            self.rejected_timeout += 1
+            return False
+        finally:
+            self.queued -= 1
+
+        self.active += 1
+        self.admitted += 1
+        return True
+
+    def release(self):
+        self.active -= 1
+        self._semaphore.release()
+
+    def stats(self):
+        return {
+            "active": self.active,
+            "queued": self.queued,
+            "max_concurrent": self.max_concurrent,
+            "max_queue": self.max_queue,
+            "admitted": self.admitted,
+            "rejected_queue_full": self.rejected_queue_full,
+            "rejected_timeout": self.rejected_timeout,
+        }
+
+limiters = {
+    "read": RouteClassLimiter("read", READ_CONCURRENCY_LIMIT, READ_QUEUE_LIMIT, REQUEST_QUEUE_TIMEOUT_SECONDS),
+    "write": RouteClassLimiter("write", WRITE_CONCURRENCY_LIMIT, WRITE_QUEUE_LIMIT, REQUEST_QUEUE_TIMEOUT_SECONDS),
+    "auth": RouteClassLimiter("auth", AUTH_CONCURRENCY_LIMIT, AUTH_QUEUE_LIMIT, REQUEST_QUEUE_TIMEOUT_SECONDS),
+}
+
+# Threads kept for requests the limiters never see (exempt paths, profiling reports)
+THREADPOOL_HEADROOM = 8
+
+def ensure_threadpool_capacity():
+    """Size the threadpool so every admitted request gets a thread right away.
+
+    Sync handlers and dependencies run on anyio's default threadpool (40
+    threads unless raised). If it were smaller than the limiters combined,
+    admitted requests would queue there, unseen by the limiter.
+    """
+    limiter = to_thread.current_default_thread_limiter()
+    required = sum(route_limiter.max_concurrent for route_limiter in limiters.values()) + THREADPOOL_HEADROOM
+    if limiter.total_tokens < required:
+        limiter.total_tokens = required
+
+def get_route_class(method: str, path: str):
+    if path in AUTH_PATHS and method == "POST":
+        return "auth"
+    if method in ("GET", "HEAD", "OPTIONS"):
+        return "read"
+    return "write"
+
+def get_load_stats():
+    return {name: limiter.stats() for name, limiter in limiters.items()}
+
+class ConcurrencyLimitMiddleware:
+    """Bounds in-flight requests per route class and sheds overload with 503.
+
+    Requests beyond the concurrency limit wait in a bounded queue; if the
+    queue is full, or no slot frees up before the deadline, the request is
+    answered immediately with 503 and Retry-After instead of piling up on
+    the threadpool until every request times out.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in EXEMPT_PATHS:
+            await self.app(scope, receive, send)
+            return
+
+        # The threadpool belongs to the event loop, so check it on every request; it is cheap
+        ensure_threadpool_capacity()
+        limiter = limiters[get_route_class(scope["method"], scope["path"])]
+        if not await limiter.acquire():
+            await self._send_overloaded(send, limiter)
+            return
+
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            limiter.release()
+
+    async def _send_overloaded(self, send, limiter: RouteClassLimiter):
+        body = json.dumps({"detail": "Server is overloaded. Please try again later."}).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 503,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(max(1, math.ceil(limiter.queue_timeout))).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
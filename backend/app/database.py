@@ -1,4 +1,4 @@
-from sqlalchemy import create_engine, Column, Integer, String, DateTime, Text, Boolean, ForeignKey, Table
+from sqlalchemy import create_engine, inspect, text, Index, Column, Integer, String, DateTime, Text, Boolean, ForeignKey, Table, Float
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, relationship
 from datetime import datetime
@@ -22,7 +22,8 @@ user_course_association = Table(
     'user_courses',
     Base.metadata,
     Column('user_id', Integer, ForeignKey('users.id'), primary_key=True),
-    Column('course_id', Integer, ForeignKey('courses.id'), primary_key=True)
+    Column('course_id', Integer, ForeignKey('courses.id'), primary_key=True),
+    Column('enrolled_at', DateTime, default=datetime.utcnow)
 )
 
 class User(Base):
@@ -41,6 +42,7 @@ class User(Base):
     taught_courses = relationship("Course", back_populates="instructor")
     enrolled_courses = relationship("Course", secondary=user_course_association, back_populates="students")
     lesson_progress = relationship("LessonProgress", back_populates="user")
+    refresh_tokens = relationship("RefreshToken", back_populates="user", cascade="all, delete-orphan")
 
 class Course(Base):
     __tablename__ = "courses"
@@ -83,8 +85,8 @@ class LessonProgress(Base):
     __tablename__ = "lesson_progress"
     
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
-    lesson_id = Column(Integer, ForeignKey("lessons.id"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    lesson_id = Column(Integer, ForeignKey("lessons.id"), nullable=False, index=True)
     is_completed = Column(Boolean, default=False)
     completed_at = Column(DateTime)
     watched_duration = Column(Integer, default=0)  # in seconds
@@ -94,6 +96,43 @@ class LessonProgress(Base):
     # Relationships
     user = relationship("User", back_populates="lesson_progress")
     lesson = relationship("Lesson", back_populates="progress_records")
+    
+    # Covering indexes for the per-lesson course analytics queries
+    __table_args__ = (
+        Index("ix_lesson_progress_lesson_completed_user", "lesson_id", "is_completed", "user_id"),
+        Index("ix_lesson_progress_lesson_watched", "lesson_id", "watched_duration"),
+    )
+
+# Sparse course x course matrix: how many students are enrolled in both courses
+class CourseCoEnrollment(Base):
+    __tablename__ = "course_co_enrollments"
+    
+    course_id = Column(Integer, ForeignKey("courses.id"), primary_key=True)
+    related_course_id = Column(Integer, ForeignKey("courses.id"), primary_key=True)
+    student_count = Column(Integer, nullable=False, default=0)
+
+class RefreshToken(Base):
+    __tablename__ = "refresh_tokens"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    token_hash = Column(String, unique=True, index=True, nullable=False)  # SHA-256 of the token
+    expires_at = Column(DateTime, nullable=False)
+    revoked_at = Column(DateTime)
+    # Set when the token was rotated; revoked tokens without it were logged out
+    replaced_by_id = Column(Integer, ForeignKey("refresh_tokens.id", ondelete="SET NULL"))
+    created_at = Column(DateTime, default=datetime.utcnow)
+    
+    # Relationships
+    user = relationship("User", back_populates="refresh_tokens")
+
+class RateLimitBucket(Base):
+    __tablename__ = "rate_limit_buckets"
+    
+    key = Column(String, primary_key=True)
+    tokens = Column(Float, nullable=False)
+    updated_at = Column(Float, nullable=False)  # Unix timestamp
+    full_at = Column(Float, index=True)  # Unix timestamp at which the bucket has refilled completely
 
 def get_db():
     db = SessionLocal()
@@ -102,11 +141,33 @@ def get_db():
     finally:
         db.close()
 
+def upgrade_existing_tables(bind=engine):
+    """Add columns and indexes that create_all can't add to tables that already exist.
+
+    Only nullable columns are added, so existing rows stay valid.
+    """
+    inspector = inspect(bind)
+    existing_tables = set(inspector.get_table_names())
+    with bind.begin() as connection:
+        for table in Base.metadata.sorted_tables:
+            if table.name not in existing_tables:
+                continue
+            existing_columns = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing_columns or not column.nullable or column.primary_key:
+                    continue
+                column_type = column.type.compile(dialect=bind.dialect)
+                connection.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}'))
+                print(f"🔧 Added column {table.name}.{column.name}")
+            for index in table.indexes:
+                index.create(bind=connection, checkfirst=True)
+
 def create_tables():
     """Create database tables, recreating if schema mismatch is detected."""
     try:
         # Try to create tables normally
         Base.metadata.create_all(bind=engine)
+        upgrade_existing_tables()
         print("✅ Database tables created/verified successfully")
     except Exception as e:
         if "no such column" in str(e).lower():
@@ -1,10 +1,16 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from .database import create_tables
-from .routers import auth, courses, lessons, dashboard
+from .auth import prune_all_refresh_tokens
+from .recommendations import build_co_enrollments_if_missing
+from .concurrency import ConcurrencyLimitMiddleware, get_load_stats
+from .profiling import ProfilingMiddleware
+from .routers import auth, courses, lessons, dashboard, profiling
 
 # Create database tables
 create_tables()
+prune_all_refresh_tokens()
+build_co_enrollments_if_missing()
 
 app = FastAPI(
     title="Course Management System API",
@@ -12,6 +18,12 @@ app = FastAPI(
     version="1.0.0"
 )
 
+# Opt-in request profiling; innermost so time spent queued for a slot isn't profiled
+app.add_middleware(ProfilingMiddleware)
+
+# Bound in-flight requests per route class; added before CORS so shed responses still get CORS headers
+app.add_middleware(ConcurrencyLimitMiddleware)
+
 # Configure CORS
 app.add_middleware(
     CORSMiddleware,
@@ -26,6 +38,7 @@ app.include_router(auth.router)
 app.include_router(courses.router)
 app.include_router(lessons.router)
 app.include_router(dashboard.router)
+app.include_router(profiling.router)
 
 @app.get("/")
 def read_root():
@@ -33,4 +46,8 @@ def read_root():
 
 @app.get("/health")
 def health_check():
-    return {"status": "healthy"}
\ No newline at end of file
+    return {"status": "healthy"}
+
+@app.get("/health/load")
+def load_stats():
+    return get_load_stats()
\ No newline at end of file
@@ -0,0 +1,231 @@
+import asyncio
+import collections
+import hmac
+import os
+import sys
+import threading
+import time
+import uuid
+from datetime import datetime
+from typing import Optional
+from urllib.parse import parse_qs
+import anyio
+from anyio import to_thread
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# On-demand profiling and the /debug endpoints require this token in X-Profile-Token
+PROFILING_TOKEN = os.getenv("PROFILING_TOKEN", "")
+# Requests still running after this many milliseconds get profiled automatically (0 disables)
+SLOW_REQUEST_THRESHOLD_MS = float(os.getenv("SLOW_REQUEST_THRESHOLD_MS", "0"))
+PROFILE_BUFFER_SIZE = int(os.getenv("PROFILE_BUFFER_SIZE", "50"))
+PROFILE_SAMPLE_INTERVAL_MS = float(os.getenv("PROFILE_SAMPLE_INTERVAL_MS", "2"))
+MAX_CONCURRENT_PROFILES = int(os.getenv("MAX_CONCURRENT_PROFILES", "2"))
+PROFILE_TOP_FUNCTIONS = 30
+
+# Frames that mean a thread is parked waiting for work rather than serving a request
+_IDLE_FUNCTIONS = {
+    ("threading.py", "wait"),
+    ("queue.py", "get"),
+    ("selectors.py", "select"),
+    ("base_events.py", "_run_once"),
+}
+
+_profiles = collections.deque(maxlen=PROFILE_BUFFER_SIZE)
+_profiles_lock = threading.Lock()
+_active_samplers = 0
+_active_samplers_lock = threading.Lock()
+
+def is_authorized(token: Optional[str]):
+    return bool(PROFILING_TOKEN) and token is not None and hmac.compare_digest(token, PROFILING_TOKEN)
+
+def _frame_label(frame):
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+class Sampler:
+    """Samples the stacks of every busy thread until stopped.
+
+    Sync handlers, dependencies and response validation run on threadpool
+    threads, so a per-thread profiler like cProfile would miss most of the
+    work; sampling all threads catches it, at the cost of also catching any
+    other request in flight at the same time.
+    """
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.stacks = collections.Counter()
+        self.sample_count = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            self.sample_count += 1
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                if (os.path.basename(frame.f_code.co_filename), frame.f_code.co_name) in _IDLE_FUNCTIONS:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_label(frame))
+                    frame = frame.f_back
+                stack.reverse()
+                self.stacks[tuple(stack)] += 1
+
+    def report(self):
+        self_samples = collections.Counter()
+        total_samples = collections.Counter()
+        for stack, count in self.stacks.items():
+            self_samples[stack[-1]] += count
+            for label in set(stack):
+                total_samples[label] += count
+        top_functions = [
+            {"function": label, "self_samples": self_samples[label], "total_samples": count}
+            for label, count in total_samples.most_common(PROFILE_TOP_FUNCTIONS)
+        ]
+        # Collapsed stacks, one per line, readable by flamegraph tools
+        folded = "\n".join(f"{';'.join(stack)} {count}" for stack, count in self.stacks.most_common())
+        return {
+            "sample_count": self.sample_count,
+            "sample_interval_ms": self.interval * 1000,
+            "top_functions": top_functions,
+            "folded_stacks": folded,
+        }
+
+def _start_sampler():
+    global _active_samplers
+    with _active_samplers_lock:
+        if _active_samplers >= MAX_CONCURRENT_PROFILES:
+            return None
+        _active_samplers += 1
+    sampler = Sampler(PROFILE_SAMPLE_INTERVAL_MS / 1000)
+    sampler.start()
+    return sampler
+
+def _stop_sampler(sampler: Sampler):
+    global _active_samplers
+    sampler.stop()
+    with _active_samplers_lock:
+        _active_samplers -= 1
+
+def _store_profile(profile: dict):
+    with _profiles_lock:
+        _profiles.append(profile)
+
+def list_profiles():
+    with _profiles_lock:
+        profiles = list(_profiles)
+    return [
+        {key: value for key, value in profile.items() if key not in ("top_functions", "folded_stacks")}
+        for profile in reversed(profiles)
+    ]
+
+def get_profile(profile_id: str):
+    with _profiles_lock:
+        for profile in _profiles:
+            if profile["id"] == profile_id:
+                return profile
+    return None
+
+def clear_profiles():
+    with _profiles_lock:
+        _profiles.clear()
+
+def _header(scope, name: bytes):
+    for key, value in scope["headers"]:
+        if key == name:
+            return value.decode("latin-1")
+    return None
+
+def _wants_profile(scope):
+    if _header(scope, b"x-profile") == "1":
+        return True
+    query = parse_qs(scope.get("query_string", b"").decode("latin-1"))
+    return query.get("profile") == ["1"]
+
+class ProfilingMiddleware:
+    """Profiles single requests on demand and captures requests that run slow.
+
+    A request carrying X-Profile: 1 (or ?profile=1) and a valid
+    X-Profile-Token is sampled from start to finish; the report id comes
+    back in X-Profile-Id. With SLOW_REQUEST_THRESHOLD_MS set, any request
+    still running past the threshold starts being sampled from that point.
+    When neither is configured, requests pass straight through.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or (not PROFILING_TOKEN and not SLOW_REQUEST_THRESHOLD_MS):
+            await self.app(scope, receive, send)
+            return
+
+        on_demand = _wants_profile(scope) and is_authorized(_header(scope, b"x-profile-token"))
+        if not on_demand and not SLOW_REQUEST_THRESHOLD_MS:
+            await self.app(scope, receive, send)
+            return
+
+        profile_id = uuid.uuid4().hex
+        started_at = datetime.utcnow()
+        start = time.perf_counter()
+        state = {"sampler": None, "status": None}
+        watchdog = None
+
+        if on_demand:
+            state["sampler"] = _start_sampler()
+        else:
+            def start_slow_sampling():
+                state["sampler"] = _start_sampler()
+            watchdog = asyncio.get_running_loop().call_later(
+                SLOW_REQUEST_THRESHOLD_MS / 1000, start_slow_sampling
+            )
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                state["status"] = message["status"]
+                if state["sampler"] is not None:
+                    message["headers"] = list(message.get("headers", [])) + [
+                        (b"x-profile-id", profile_id.encode())
+                    ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            if watchdog is not None:
+                watchdog.cancel()
+            sampler = state["sampler"]
+            if sampler is not None:
+                duration_ms = (time.perf_counter() - start) * 1000
+                # Joining the sampler and building the report block, so keep them off the event loop;
+                # shielded so a cancelled request still stops its sampler
+                with anyio.CancelScope(shield=True):
+                    await to_thread.run_sync(_stop_sampler, sampler)
+                    # A slow request that finished before the first sample has nothing to show;
+                    # on-demand profiles are always kept, their id was already sent
+                    keep = on_demand or sampler.sample_count > 0
+                    report = await to_thread.run_sync(sampler.report) if keep else None
+                if report is not None:
+                    profile = {
+                        "id": profile_id,
+                        "trigger": "on_demand" if on_demand else "slow_request",
+                        "method": scope["method"],
+                        "path": scope["path"],
+                        "status_code": state["status"],
+                        "started_at": started_at.isoformat(),
+                        "duration_ms": round(duration_ms, 2),
+                    }
+                    profile.update(report)
+                    _store_profile(profile)
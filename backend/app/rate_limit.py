@@ -0,0 +1,151 @@
+import math
+import os
+import threading
+import time
+from typing import Optional, Tuple
+from fastapi import Depends, HTTPException, Request, status
+from fastapi.security import OAuth2PasswordRequestForm
+from sqlalchemy import or_
+from sqlalchemy.exc import IntegrityError
+from . import database
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Limits are "<requests>/<seconds>": a bucket holds <requests> tokens and refills
+# at <requests> per <seconds>, so short bursts are allowed up to the full limit.
+LOGIN_RATE_LIMIT_PER_IP = os.getenv("LOGIN_RATE_LIMIT_PER_IP", "20/60")
+LOGIN_RATE_LIMIT_PER_USERNAME = os.getenv("LOGIN_RATE_LIMIT_PER_USERNAME", "10/60")
+REGISTER_RATE_LIMIT_PER_IP = os.getenv("REGISTER_RATE_LIMIT_PER_IP", "5/60")
+RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "memory")  # "memory" or "database"
+
+def parse_rate_limit(value: str) -> Tuple[float, float]:
+    """Parse "<requests>/<seconds>" into (capacity, tokens refilled per second)."""
+    requests, seconds = value.split("/")
+    capacity = float(requests)
+    return capacity, capacity / float(seconds)
+
+class InMemoryRateLimitBackend:
+    """Token buckets held in this process; limits apply per worker."""
+
+    max_buckets = 100000
+
+    def __init__(self):
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def consume(self, key: str, capacity: float, refill_rate: float) -> Optional[float]:
+        """Take one token from the bucket. Returns None if allowed, else seconds until a token is available."""
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated, _ = self._buckets.get(key, (capacity, now, now))
+            tokens = min(capacity, tokens + (now - updated) * refill_rate)
+            if tokens >= 1:
+                tokens -= 1
+                retry_after = None
+            else:
+                retry_after = (1 - tokens) / refill_rate
+            if len(self._buckets) >= self.max_buckets and key not in self._buckets:
+                self._evict_full_buckets(now)
+            self._buckets[key] = (tokens, now, now + (capacity - tokens) / refill_rate)
+            return retry_after
+
+    def _evict_full_buckets(self, now: float):
+        # A bucket that has refilled completely carries no state
+        full = [key for key, (_, _, full_at) in self._buckets.items() if full_at <= now]
+        for key in full:
+            del self._buckets[key]
+        if len(self._buckets) >= self.max_buckets:
+            self._buckets.clear()
+
+class DatabaseRateLimitBackend:
+    """Token buckets stored in the application database, shared by all workers."""
+
+    max_attempts = 5
+    # Seconds between sweeps that delete buckets which have refilled completely
+    prune_interval = 60
+
+    def __init__(self):
+        self._next_prune = 0.0
+        self._prune_lock = threading.Lock()
+
+    def consume(self, key: str, capacity: float, refill_rate: float) -> Optional[float]:
+        db = database.SessionLocal()
+        try:
+            self._prune_if_due(db)
+            for _ in range(self.max_attempts):
+                now = time.time()
+                bucket = db.query(database.RateLimitBucket)\
+                          .filter(database.RateLimitBucket.key == key).first()
+                if bucket is None:
+                    db.add(database.RateLimitBucket(
+                        key=key, tokens=capacity - 1, updated_at=now, full_at=now + 1 / refill_rate
+                    ))
+                    try:
+                        db.commit()
+                        return None
+                    except IntegrityError:
+                        db.rollback()
+                        continue
+
+                tokens = min(capacity, bucket.tokens + (now - bucket.updated_at) * refill_rate)
+                allowed = tokens >= 1
+                remaining = tokens - 1 if allowed else tokens
+                # Compare-and-set on updated_at so concurrent workers never spend the same token
+                updated = db.query(database.RateLimitBucket)\
+                           .filter(database.RateLimitBucket.key == key,
+                                   database.RateLimitBucket.updated_at == bucket.updated_at)\
+                           .update({
+                               database.RateLimitBucket.tokens: remaining,
+                               database.RateLimitBucket.updated_at: now,
+                               database.RateLimitBucket.full_at: now + (capacity - remaining) / refill_rate
+                           }, synchronize_session=False)
+                db.commit()
+                if updated:
+                    return None if allowed else (1 - tokens) / refill_rate
+                db.expire_all()
+            return 1 / refill_rate
+        finally:
+            db.close()
+
+    def _prune_if_due(self, db):
+        now = time.time()
+        with self._prune_lock:
+            if now < self._next_prune:
+                return
+            self._next_prune = now + self.prune_interval
+        self.prune(db, now)
+
+    def prune(self, db, now: float):
+        """Delete buckets that have refilled completely; like a missing bucket, they carry no state."""
+        db.query(database.RateLimitBucket)\
+          .filter(or_(database.RateLimitBucket.full_at <= now, database.RateLimitBucket.full_at == None))\
+          .delete(synchronize_session=False)
+        db.commit()
+
+def get_rate_limit_backend():
+    if RATE_LIMIT_BACKEND == "database":
+        return DatabaseRateLimitBackend()
+    return InMemoryRateLimitBackend()
+
+backend = get_rate_limit_backend()
+
+def check_rate_limit(key: str, limit: str):
+    capacity, refill_rate = parse_rate_limit(limit)
+    retry_after = backend.consume(key, capacity, refill_rate)
+    if retry_after is not None:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many requests. Please try again later.",
+            headers={"Retry-After": str(math.ceil(retry_after))},
+        )
+
+def get_client_ip(request: Request):
+    return request.client.host if request.client else "unknown"
+
+def limit_login(request: Request, form_data: OAuth2PasswordRequestForm = Depends()):
+    check_rate_limit(f"login:ip:{get_client_ip(request)}", LOGIN_RATE_LIMIT_PER_IP)
+    check_rate_limit(f"login:user:{form_data.username.lower()}", LOGIN_RATE_LIMIT_PER_USERNAME)
+
+def limit_register(request: Request):
+    check_rate_limit(f"register:ip:{get_client_ip(request)}", REGISTER_RATE_LIMIT_PER_IP)
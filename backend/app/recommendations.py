@@ -0,0 +1,136 @@
+import threading
+from sqlalchemy import select, func, and_, or_
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from . import database
+
+RELATED_COURSES_TOP_K = 10
+REBUILD_BATCH_SIZE = 500
+
+# Top-k neighbors per course, loaded from course_co_enrollments on first use
+_top_k_cache = {}
+_generation = 0
+_cache_lock = threading.Lock()
+
+def invalidate_related_courses(course_ids=None):
+    global _generation
+    with _cache_lock:
+        if course_ids is None:
+            _top_k_cache.clear()
+        else:
+            for course_id in course_ids:
+                _top_k_cache.pop(course_id, None)
+        _generation += 1
+
+def rebuild_co_enrollments(db: Session, batch_size: int = REBUILD_BATCH_SIZE):
+    """Recompute the co-enrollment matrix from user_courses.
+
+    Rows are produced by a grouped self-join, one range of course ids at a
+    time, so each batch is a single INSERT ... SELECT and memory stays flat.
+    Each range is replaced in its own transaction, so readers never see an
+    empty matrix.
+    """
+    enrollment = database.user_course_association
+    other = enrollment.alias("other")
+    co_enrollments = database.CourseCoEnrollment.__table__
+
+    max_course_id = db.query(func.max(enrollment.c.course_id)).scalar() or 0
+    for start in range(0, max_course_id + 1, batch_size):
+        pairs = select(
+            enrollment.c.course_id,
+            other.c.course_id,
+            func.count()
+        )\
+        .join(other, and_(
+            other.c.user_id == enrollment.c.user_id,
+            other.c.course_id != enrollment.c.course_id
+        ))\
+        .where(enrollment.c.course_id >= start, enrollment.c.course_id < start + batch_size)\
+        .group_by(enrollment.c.course_id, other.c.course_id)
+        db.execute(co_enrollments.delete().where(
+            co_enrollments.c.course_id >= start, co_enrollments.c.course_id < start + batch_size
+        ))
+        db.execute(co_enrollments.insert().from_select(
+            ["course_id", "related_course_id", "student_count"], pairs
+        ))
+        db.commit()
+
+    invalidate_related_courses()
+
+def build_co_enrollments_if_missing():
+    """Build the matrix once for enrollments that predate it, e.g. on first deploy."""
+    db = database.SessionLocal()
+    try:
+        has_matrix = db.query(database.CourseCoEnrollment.course_id).first() is not None
+        has_enrollments = db.query(database.user_course_association.c.user_id).first() is not None
+        if has_enrollments and not has_matrix:
+            rebuild_co_enrollments(db)
+            print("✅ Course co-enrollment matrix built")
+    finally:
+        db.close()
+
+def record_enrollment(db: Session, user_id: int, course_id: int):
+    """Add a new enrollment to the matrix: one row and one column update for the course.
+
+    Runs in the enrollment's transaction, so the caller commits and then
+    calls invalidate_related_courses() with the returned course ids.
+    """
+    # Serialize a user's enrollments so two at once still see each other exactly once
+    db.query(database.User.id).filter(database.User.id == user_id).with_for_update().one()
+    rows = db.query(database.user_course_association.c.course_id)\
+             .filter(database.user_course_association.c.user_id == user_id,
+                     database.user_course_association.c.course_id != course_id).all()
+    other_course_ids = [other_course_id for (other_course_id,) in rows]
+    if not other_course_ids:
+        return []
+
+    # Upsert so a pair first created by a concurrent enrollment is incremented, not a conflict;
+    # sorted so concurrent upserts lock rows in the same order
+    co_enrollments = database.CourseCoEnrollment.__table__
+    dialect_insert = postgresql.insert if db.get_bind().dialect.name == "postgresql" else sqlite.insert
+    upsert = dialect_insert(co_enrollments).on_conflict_do_update(
+        index_elements=[co_enrollments.c.course_id, co_enrollments.c.related_course_id],
+        set_={"student_count": co_enrollments.c.student_count + 1}
+    )
+    pairs = sorted([(course_id, other) for other in other_course_ids] +
+                   [(other, course_id) for other in other_course_ids])
+    db.execute(upsert, [
+        {"course_id": first, "related_course_id": second, "student_count": 1} for first, second in pairs
+    ])
+    return [course_id] + other_course_ids
+
+def remove_course(db: Session, course_id: int):
+    """Drop a course from the matrix. Caller commits, then calls invalidate_related_courses()."""
+    db.query(database.CourseCoEnrollment)\
+      .filter(or_(database.CourseCoEnrollment.course_id == course_id,
+                  database.CourseCoEnrollment.related_course_id == course_id))\
+      .delete(synchronize_session=False)
+
+def get_related_course_ids(db: Session, course_id: int):
+    """Return [(related_course_id, student_count)] for the top-k co-enrolled courses."""
+    with _cache_lock:
+        cached = _top_k_cache.get(course_id)
+        generation = _generation
+    if cached is not None:
+        return cached
+
+    rows = db.query(database.CourseCoEnrollment.related_course_id,
+                    database.CourseCoEnrollment.student_count)\
+             .filter(database.CourseCoEnrollment.course_id == course_id)\
+             .order_by(database.CourseCoEnrollment.student_count.desc(),
+                       database.CourseCoEnrollment.related_course_id)\
+             .limit(RELATED_COURSES_TOP_K).all()
+    neighbors = [(related_course_id, student_count) for related_course_id, student_count in rows]
+    with _cache_lock:
+        # Skip caching if the matrix changed while we were reading it
+        if _generation == generation:
+            _top_k_cache[course_id] = neighbors
+    return neighbors
+
+if __name__ == "__main__":
+    db = database.SessionLocal()
+    try:
+        rebuild_co_enrollments(db)
+        print("✅ Course co-enrollment matrix rebuilt")
+    finally:
+        db.close()
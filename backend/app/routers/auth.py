@@ -2,11 +2,11 @@ from datetime import timedelta
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
-from .. import database, schemas, auth
+from .. import database, schemas, auth, rate_limit
 
 router = APIRouter(prefix="/auth", tags=["authentication"])
 
-@router.post("/register", response_model=schemas.User)
+@router.post("/register", response_model=schemas.User, dependencies=[Depends(rate_limit.limit_register)])
 def register_user(user: schemas.UserCreate, db: Session = Depends(database.get_db)):
     # Check if user already exists
     db_user_email = auth.get_user_by_email(db, email=user.email)
@@ -37,7 +37,7 @@ def register_user(user: schemas.UserCreate, db: Session = Depends(database.get_d
     db.refresh(db_user)
     return db_user
 
-@router.post("/token", response_model=schemas.Token)
+@router.post("/token", response_model=schemas.Token, dependencies=[Depends(rate_limit.limit_login)])
 def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(database.get_db)):
     user = auth.authenticate_user(db, form_data.username, form_data.password)
     if not user:
@@ -50,7 +50,32 @@ def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depend
     access_token = auth.create_access_token(
         data={"sub": user.username}, expires_delta=access_token_expires
     )
-    return {"access_token": access_token, "token_type": "bearer"}
+    auth.prune_refresh_tokens(db, user.id)
+    refresh_token = auth.create_refresh_token(db, user)
+    db.commit()
+    return {"access_token": access_token, "token_type": "bearer", "refresh_token": refresh_token}
+
+@router.post("/refresh", response_model=schemas.Token)
+def refresh_access_token(request: schemas.RefreshTokenRequest, db: Session = Depends(database.get_db)):
+    # Renewing a session costs a token lookup instead of a bcrypt password check
+    result = auth.rotate_refresh_token(db, request.refresh_token)
+    if not result:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid or expired refresh token",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    user, refresh_token = result
+    access_token_expires = timedelta(minutes=auth.ACCESS_TOKEN_EXPIRE_MINUTES)
+    access_token = auth.create_access_token(
+        data={"sub": user.username}, expires_delta=access_token_expires
+    )
+    return {"access_token": access_token, "token_type": "bearer", "refresh_token": refresh_token}
+
+@router.post("/logout")
+def logout(request: schemas.RefreshTokenRequest, db: Session = Depends(database.get_db)):
+    auth.revoke_refresh_token(db, request.refresh_token)
+    return {"message": "Successfully logged out"}
 
 @router.get("/me", response_model=schemas.User)
 def read_users_me(current_user: database.User = Depends(auth.get_current_active_user)):
@@ -1,11 +1,14 @@
 from typing import List
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
-from sqlalchemy import func
-from .. import database, schemas, auth
+from sqlalchemy import func, and_, case, insert, update
+from .. import database, schemas, auth, analytics, recommendations
 
 router = APIRouter(prefix="/courses", tags=["courses"])
 
+# Upper bound on created plus updated lessons in one bulk request
+MAX_BULK_LESSONS = 1000
+
 @router.get("/", response_model=List[schemas.Course])
 def get_courses(
     skip: int = 0, 
@@ -64,6 +67,42 @@ def get_course(
     
     return course
 
+@router.get("/{course_id}/related", response_model=List[schemas.RelatedCourse])
+def get_related_courses(course_id: int, db: Session = Depends(database.get_db)):
+    # Neighbors come from the precomputed co-enrollment matrix, cached in memory
+    neighbors = recommendations.get_related_course_ids(db, course_id)
+    if not neighbors:
+        return []
+    
+    courses = db.query(database.Course)\
+               .filter(database.Course.id.in_([related_id for related_id, _ in neighbors]),
+                       database.Course.is_published == True).all()
+    courses_by_id = {course.id: course for course in courses}
+    
+    related = []
+    for related_id, student_count in neighbors:
+        course = courses_by_id.get(related_id)
+        if course:
+            related.append({
+                "id": course.id,
+                "title": course.title,
+                "description": course.description,
+                "thumbnail_url": course.thumbnail_url,
+                "price": course.price,
+                "co_enrolled_students": student_count
+            })
+    return related
+
+@router.get("/{course_id}/analytics", response_model=schemas.CourseAnalytics)
+def get_course_analytics(
+    course_id: int,
+    current_user: database.User = Depends(auth.get_current_instructor),
+    db: Session = Depends(database.get_db)
+):
+    get_owned_course(db, course_id, current_user)
+    
+    return analytics.get_course_analytics(db, course_id)
+
 @router.post("/", response_model=schemas.Course)
 def create_course(
     course: schemas.CourseCreate,
@@ -118,8 +157,10 @@ def delete_course(
     if db_course.instructor_id != current_user.id:
         raise HTTPException(status_code=403, detail="Not authorized to delete this course")
     
+    recommendations.remove_course(db, course_id)
     db.delete(db_course)
     db.commit()
+    recommendations.invalidate_related_courses()
     return {"message": "Course deleted successfully"}
 
 @router.post("/{course_id}/enroll")
@@ -147,11 +188,113 @@ def enroll_in_course(
         course_id=course_id
     )
     db.execute(enrollment)
+    related_course_ids = recommendations.record_enrollment(db, current_user.id, course_id)
     db.commit()
+    analytics.invalidate_course_analytics(course_id)
+    recommendations.invalidate_related_courses(related_course_ids)
     
     return {"message": "Successfully enrolled in course"}
 
-@router.get("/my/enrolled", response_model=List[schemas.Course])
+def get_owned_course(db: Session, course_id: int, current_user: database.User):
+    course = db.query(database.Course).filter(database.Course.id == course_id).first()
+    if not course:
+        raise HTTPException(status_code=404, detail="Course not found")
+    
+    if course.instructor_id != current_user.id:
+        raise HTTPException(status_code=403, detail="Not authorized to manage this course")
+    return course
+
+@router.post("/{course_id}/lessons:bulk", response_model=List[schemas.Lesson])
+def bulk_upsert_lessons(
+    course_id: int,
+    bulk: schemas.LessonBulkRequest,
+    current_user: database.User = Depends(auth.get_current_instructor),
+    db: Session = Depends(database.get_db)
+):
+    get_owned_course(db, course_id, current_user)
+    
+    if len(bulk.create) + len(bulk.update) > MAX_BULK_LESSONS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {MAX_BULK_LESSONS} lessons can be created or updated per request"
+        )
+    
+    update_ids = [lesson.id for lesson in bulk.update]
+    if len(set(update_ids)) != len(update_ids):
+        raise HTTPException(status_code=400, detail="Duplicate lesson ids in update")
+    
+    if update_ids:
+        found_ids = {lesson_id for (lesson_id,) in db.query(database.Lesson.id)\
+                     .filter(database.Lesson.id.in_(update_ids),
+                             database.Lesson.course_id == course_id).all()}
+        missing_ids = [lesson_id for lesson_id in update_ids if lesson_id not in found_ids]
+        if missing_ids:
+            raise HTTPException(status_code=404, detail=f"Lessons not found in this course: {missing_ids}")
+        
+        # Bulk UPDATE by primary key, one executemany per distinct set of fields
+        db.execute(update(database.Lesson), [
+            {"id": lesson.id, **lesson.dict(exclude_unset=True, exclude={"id"})}
+            for lesson in bulk.update
+        ])
+    
+    created_ids = []
+    if bulk.create:
+        # Like the lesson create page, lessons without a position go after the last one
+        last_index = db.query(func.max(database.Lesson.order_index))\
+                       .filter(database.Lesson.course_id == course_id).scalar() or 0
+        last_index = max([last_index] + [lesson.order_index for lesson in bulk.create
+                                         if lesson.order_index is not None])
+        new_lessons = []
+        for lesson in bulk.create:
+            values = lesson.dict()
+            if values["order_index"] is None:
+                last_index += 1
+                values["order_index"] = last_index
+            new_lessons.append({**values, "course_id": course_id})
+        created_ids = list(db.scalars(
+            insert(database.Lesson).returning(database.Lesson.id), new_lessons
+        ))
+    
+    db.commit()
+    analytics.invalidate_course_analytics(course_id)
+    
+    return db.query(database.Lesson)\
+             .filter(database.Lesson.id.in_(update_ids + created_ids))\
+             .order_by(database.Lesson.order_index, database.Lesson.id).all()
+
+@router.put("/{course_id}/lessons/order", response_model=List[schemas.Lesson])
+def reorder_lessons(
+    course_id: int,
+    order: schemas.LessonOrder,
+    current_user: database.User = Depends(auth.get_current_instructor),
+    db: Session = Depends(database.get_db)
+):
+    get_owned_course(db, course_id, current_user)
+    
+    lesson_ids = {lesson_id for (lesson_id,) in db.query(database.Lesson.id)\
+                  .filter(database.Lesson.course_id == course_id).all()}
+    if len(order.lesson_ids) != len(lesson_ids) or set(order.lesson_ids) != lesson_ids:
+        raise HTTPException(
+            status_code=400,
+            detail="lesson_ids must list every lesson of the course exactly once"
+        )
+    
+    if lesson_ids:
+        # One UPDATE ... CASE for the whole course; positions start at 1 like lessons created in the UI
+        db.query(database.Lesson)\
+          .filter(database.Lesson.course_id == course_id)\
+          .update({database.Lesson.order_index: case(
+              {lesson_id: index for index, lesson_id in enumerate(order.lesson_ids, start=1)},
+              value=database.Lesson.id
+          )}, synchronize_session=False)
+        db.commit()
+        analytics.invalidate_course_analytics(course_id)
+    
+    return db.query(database.Lesson)\
+             .filter(database.Lesson.course_id == course_id)\
+             .order_by(database.Lesson.order_index).all()
+
+@router.get("/my/enrolled", response_model=List[schemas.EnrolledCourse])
 def get_my_enrolled_courses(
     current_user: database.User = Depends(auth.get_current_active_user),
     db: Session = Depends(database.get_db)
@@ -159,12 +302,49 @@ def get_my_enrolled_courses(
     courses = db.query(database.Course)\
                .join(database.user_course_association)\
                .filter(database.user_course_association.c.user_id == current_user.id).all()
+    if not courses:
+        return courses
+    
+    enrollment = database.user_course_association.alias("enrollment")
+    
+    # Student count for every enrolled course in one grouped query
+    student_counts = dict(
+        db.query(database.user_course_association.c.course_id,
+                 func.count(database.user_course_association.c.user_id))\
+          .join(enrollment, and_(
+              enrollment.c.course_id == database.user_course_association.c.course_id,
+              enrollment.c.user_id == current_user.id
+          ))\
+          .group_by(database.user_course_association.c.course_id).all()
+    )
+    
+    # Published and completed lesson counts for every enrolled course in one grouped query
+    lesson_counts = {
+        course_id: (completed, total)
+        for course_id, completed, total in db.query(
+            database.Lesson.course_id,
+            func.count(database.LessonProgress.lesson_id.distinct()),
+            func.count(database.Lesson.id.distinct())
+        )\
+        .join(enrollment, and_(
+            enrollment.c.course_id == database.Lesson.course_id,
+            enrollment.c.user_id == current_user.id
+        ))\
+        .outerjoin(database.LessonProgress, and_(
+            database.LessonProgress.lesson_id == database.Lesson.id,
+            database.LessonProgress.user_id == current_user.id,
+            database.LessonProgress.is_completed == True
+        ))\
+        .filter(database.Lesson.is_published == True)\
+        .group_by(database.Lesson.course_id).all()
+    }
     
-    # Add student count to each course
     for course in courses:
-        student_count = db.query(func.count(database.user_course_association.c.user_id))\
-                         .filter(database.user_course_association.c.course_id == course.id).scalar()
-        course.student_count = student_count or 0
+        completed, total = lesson_counts.get(course.id, (0, 0))
+        course.student_count = student_counts.get(course.id, 0)
+        course.completed_lessons = completed
+        course.total_lessons = total
+        course.progress_percent = completed * 100 // total if total else 0
     
     return courses
 
@@ -2,7 +2,7 @@ from typing import List
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 from datetime import datetime
-from .. import database, schemas, auth
+from .. import database, schemas, auth, analytics
 
 router = APIRouter(prefix="/lessons", tags=["lessons"])
 
@@ -31,6 +31,7 @@ def create_lesson(
     db.add(db_lesson)
     db.commit()
     db.refresh(db_lesson)
+    analytics.invalidate_course_analytics(db_lesson.course_id)
     return db_lesson
 
 @router.get("/{lesson_id}", response_model=schemas.Lesson)
@@ -83,6 +84,7 @@ def update_lesson(
     
     db.commit()
     db.refresh(db_lesson)
+    analytics.invalidate_course_analytics(db_lesson.course_id)
     return db_lesson
 
 @router.delete("/{lesson_id}")
@@ -99,8 +101,10 @@ def delete_lesson(
     if db_lesson.course.instructor_id != current_user.id:
         raise HTTPException(status_code=403, detail="Not authorized to delete this lesson")
     
+    course_id = db_lesson.course_id
     db.delete(db_lesson)
     db.commit()
+    analytics.invalidate_course_analytics(course_id)
     return {"message": "Lesson deleted successfully"}
 
 @router.post("/{lesson_id}/complete")
@@ -136,6 +140,7 @@ def mark_lesson_complete(
         db.add(progress)
     
     db.commit()
+    analytics.invalidate_course_analytics(lesson.course_id)
     return {"message": "Lesson marked as complete"}
 
 @router.post("/{lesson_id}/uncomplete")
@@ -170,6 +175,7 @@ def mark_lesson_incomplete(
         db.add(progress)
     
     db.commit()
+    analytics.invalidate_course_analytics(lesson.course_id)
     return {"message": "Lesson marked as incomplete"}
 
 @router.get("/course/{course_id}", response_model=List[schemas.Lesson])
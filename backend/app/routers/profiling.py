@@ -0,0 +1,28 @@
+from typing import Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, status
+from .. import profiling
+
+router = APIRouter(prefix="/debug", tags=["debugging"])
+
+def require_profiling_token(x_profile_token: Optional[str] = Header(None)):
+    if not profiling.is_authorized(x_profile_token):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Valid X-Profile-Token required"
+        )
+
+@router.get("/profiles", dependencies=[Depends(require_profiling_token)])
+def list_profiles():
+    return profiling.list_profiles()
+
+@router.get("/profiles/{profile_id}", dependencies=[Depends(require_profiling_token)])
+def get_profile(profile_id: str):
+    profile = profiling.get_profile(profile_id)
+    if not profile:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return profile
+
+@router.delete("/profiles", dependencies=[Depends(require_profiling_token)])
+def clear_profiles():
+    profiling.clear_profiles()
+    return {"message": "Profiles cleared"}
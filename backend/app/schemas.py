@@ -1,5 +1,5 @@
-from pydantic import BaseModel, EmailStr
-from datetime import datetime
+from pydantic import BaseModel, EmailStr, field_validator
+from datetime import datetime, date
 from typing import List, Optional
 
 # User schemas
@@ -82,10 +82,39 @@ class Lesson(LessonBase):
     class Config:
         from_attributes = True
 
+# Bulk lesson authoring
+class LessonBulkUpdate(LessonUpdate):
+    id: int
+
+    @field_validator("title", "order_index", "is_published")
+    @classmethod
+    def not_null(cls, value):
+        # These fields may be left out of an update, but a lesson always has them
+        if value is None:
+            raise ValueError("may be omitted but not null")
+        return value
+
+class LessonBulkCreate(LessonBase):
+    # Omitted positions are assigned after the course's last lesson
+    order_index: Optional[int] = None
+
+class LessonBulkRequest(BaseModel):
+    create: List[LessonBulkCreate] = []
+    update: List[LessonBulkUpdate] = []
+
+class LessonOrder(BaseModel):
+    lesson_ids: List[int]
+
 # Course with lessons
 class CourseWithLessons(Course):
     lessons: List[Lesson] = []
 
+# Enrolled course with the current user's progress
+class EnrolledCourse(Course):
+    completed_lessons: int = 0
+    total_lessons: int = 0
+    progress_percent: int = 0
+
 # Progress schemas
 class LessonProgressCreate(BaseModel):
     lesson_id: int
@@ -105,6 +134,10 @@ class LessonProgress(BaseModel):
 class Token(BaseModel):
     access_token: str
     token_type: str
+    refresh_token: Optional[str] = None
+
+class RefreshTokenRequest(BaseModel):
+    refresh_token: str
 
 class TokenData(BaseModel):
     username: Optional[str] = None
@@ -122,4 +155,39 @@ class DashboardStats(BaseModel):
     total_courses: int
     enrolled_courses: int
     completed_lessons: int
-    total_students: Optional[int] = None  # For instructors
\ No newline at end of file
+    total_students: Optional[int] = None  # For instructors
+
+# Related courses schema
+class RelatedCourse(BaseModel):
+    id: int
+    title: str
+    description: Optional[str] = None
+    thumbnail_url: Optional[str] = None
+    price: int = 0
+    co_enrolled_students: int
+
+# Course analytics schemas
+class LessonAnalytics(BaseModel):
+    lesson_id: int
+    title: str
+    order_index: int
+    completed_count: int
+    completion_rate: float
+    drop_off: int
+    median_watched_duration: Optional[float] = None
+
+class FunnelStep(BaseModel):
+    lessons_completed: int
+    students: int
+
+class EnrollmentPoint(BaseModel):
+    day: date
+    enrollments: int
+    cumulative_enrollments: int
+
+class CourseAnalytics(BaseModel):
+    course_id: int
+    total_students: int
+    lessons: List[LessonAnalytics] = []
+    funnel: List[FunnelStep] = []
+    enrollment_over_time: List[EnrollmentPoint] = []
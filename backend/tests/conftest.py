@@ -0,0 +1,87 @@
+import os
+import tempfile
+
+# Point the app at a throwaway database and generous auth limits before it is imported
+_db_dir = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_db_dir, 'test.db')}"
+os.environ.setdefault("LOGIN_RATE_LIMIT_PER_IP", "100000/1")
+os.environ.setdefault("LOGIN_RATE_LIMIT_PER_USERNAME", "100000/1")
+os.environ.setdefault("REGISTER_RATE_LIMIT_PER_IP", "100000/1")
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from app import database, auth, analytics, recommendations, rate_limit, concurrency, profiling
+from app.main import app
+
+TEST_PASSWORD = "password"
+_password_hash = None
+
+def password_hash():
+    # bcrypt is slow on purpose; hash the shared test password once per session
+    global _password_hash
+    if _password_hash is None:
+        _password_hash = auth.get_password_hash(TEST_PASSWORD)
+    return _password_hash
+
+@pytest.fixture(autouse=True)
+def reset_state():
+    database.Base.metadata.drop_all(bind=database.engine)
+    database.Base.metadata.create_all(bind=database.engine)
+    analytics._cache.clear()
+    analytics._generations.clear()
+    recommendations.invalidate_related_courses()
+    auth._revoked_refresh_tokens.clear()
+    profiling.clear_profiles()
+    rate_limit.backend = rate_limit.InMemoryRateLimitBackend()
+    for name, limiter in list(concurrency.limiters.items()):
+        concurrency.limiters[name] = concurrency.RouteClassLimiter(
+            name, limiter.max_concurrent, limiter.max_queue, limiter.queue_timeout
+        )
+    yield
+
+@pytest.fixture
+def client():
+    return TestClient(app)
+
+@pytest.fixture
+def db():
+    session = database.SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+@pytest.fixture
+def make_user(db):
+    def _make_user(username: str, is_instructor: bool = False):
+        user = database.User(
+            email=f"{username}@example.com",
+            username=username,
+            full_name=username.title(),
+            hashed_password=password_hash(),
+            is_instructor=is_instructor
+        )
+        db.add(user)
+        db.commit()
+        db.refresh(user)
+        token = auth.create_access_token(data={"sub": user.username})
+        return user, {"Authorization": f"Bearer {token}"}
+    return _make_user
+
+@pytest.fixture
+def count_queries():
+    """Return a callable that runs a function and reports how many SQL statements it issued."""
+    def _count_queries(func):
+        statements = []
+
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(database.engine, "before_cursor_execute", before_cursor_execute)
+        try:
+            result = func()
+        finally:
+            event.remove(database.engine, "before_cursor_execute", before_cursor_execute)
+        return result, len(statements)
+    return _count_queries
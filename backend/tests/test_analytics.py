@@ -0,0 +1,162 @@
+import time
+from datetime import datetime, timedelta
+import pytest
+from sqlalchemy import create_engine, inspect, text
+from app import database, analytics
+
+# Cold (uncached) analytics for a course with 100k students must finish within this bound
+ANALYTICS_LATENCY_TARGET_SECONDS = 1.5
+CACHED_ANALYTICS_LATENCY_TARGET_SECONDS = 0.05
+
+def create_course(db, instructor, lesson_count):
+    course = database.Course(title="Analytics", is_published=True, instructor_id=instructor.id)
+    db.add(course)
+    db.commit()
+    db.execute(database.Lesson.__table__.insert(), [
+        {"title": f"Lesson {n}", "course_id": course.id, "order_index": n + 1, "is_published": True}
+        for n in range(lesson_count)
+    ])
+    db.commit()
+    lesson_ids = [lesson_id for (lesson_id,) in db.query(database.Lesson.id)
+                  .filter(database.Lesson.course_id == course.id).order_by(database.Lesson.order_index)]
+    return course, lesson_ids
+
+def test_course_analytics(client, db, make_user):
+    instructor, instructor_headers = make_user("teacher", is_instructor=True)
+    course, lesson_ids = create_course(db, instructor, 3)
+    students = [make_user(f"student{n}") for n in range(4)]
+    for n, (_, headers) in enumerate(students):
+        assert client.post(f"/courses/{course.id}/enroll", headers=headers).status_code == 200
+        # Student n completes the first n lessons
+        for lesson_id in lesson_ids[:n]:
+            client.post(f"/lessons/{lesson_id}/complete", headers=headers)
+    db.query(database.LessonProgress)\
+      .filter(database.LessonProgress.lesson_id == lesson_ids[0])\
+      .update({database.LessonProgress.watched_duration: database.LessonProgress.user_id * 10})
+    db.commit()
+    analytics.invalidate_course_analytics(course.id)
+
+    response = client.get(f"/courses/{course.id}/analytics", headers=instructor_headers)
+
+    assert response.status_code == 200
+    data = response.json()
+    assert data["total_students"] == 4
+    assert [lesson["completed_count"] for lesson in data["lessons"]] == [3, 2, 1]
+    assert [lesson["drop_off"] for lesson in data["lessons"]] == [1, 1, 1]
+    first_lesson_watchers = sorted(user.id * 10 for user, _ in students[1:])
+    assert data["lessons"][0]["median_watched_duration"] == first_lesson_watchers[1]
+    assert [step["students"] for step in data["funnel"]] == [3, 2, 1]
+    assert data["enrollment_over_time"][-1]["cumulative_enrollments"] == 4
+
+def test_median_watched_duration(db, make_user):
+    instructor, _ = make_user("teacher", is_instructor=True)
+    course, lesson_ids = create_course(db, instructor, 2)
+    students = [make_user(f"student{n}")[0] for n in range(4)]
+    db.execute(database.LessonProgress.__table__.insert(), [
+        {"user_id": student.id, "lesson_id": lesson_ids[0], "watched_duration": duration}
+        for student, duration in zip(students, [40, 10, 30, 20])
+    ] + [
+        {"user_id": student.id, "lesson_id": lesson_ids[1], "watched_duration": duration}
+        for student, duration in zip(students, [7, 5, 9])
+    ])
+    db.commit()
+
+    medians = analytics.compute_median_watched_durations(db, course.id)
+
+    assert medians == {lesson_ids[0]: 25, lesson_ids[1]: 7}
+
+def test_course_analytics_invalidated_by_progress(client, db, make_user):
+    instructor, instructor_headers = make_user("teacher", is_instructor=True)
+    _, student_headers = make_user("student")
+    course, lesson_ids = create_course(db, instructor, 1)
+    client.post(f"/courses/{course.id}/enroll", headers=student_headers)
+
+    before = client.get(f"/courses/{course.id}/analytics", headers=instructor_headers).json()
+    client.post(f"/lessons/{lesson_ids[0]}/complete", headers=student_headers)
+    after = client.get(f"/courses/{course.id}/analytics", headers=instructor_headers).json()
+
+    assert before["lessons"][0]["completed_count"] == 0
+    assert after["lessons"][0]["completed_count"] == 1
+
+def test_expired_analytics_are_evicted(db, make_user):
+    instructor, _ = make_user("teacher", is_instructor=True)
+    first, _ = create_course(db, instructor, 1)
+    second, _ = create_course(db, instructor, 1)
+    analytics.get_course_analytics(db, first.id)
+    cached_at, cached = analytics._cache[first.id]
+    analytics._cache[first.id] = (cached_at - analytics.ANALYTICS_CACHE_TTL_SECONDS, cached)
+
+    analytics.get_course_analytics(db, second.id)
+
+    assert set(analytics._cache) == {second.id}
+
+def test_course_analytics_requires_owner(client, db, make_user):
+    instructor, _ = make_user("teacher", is_instructor=True)
+    _, other_headers = make_user("other", is_instructor=True)
+    course, _ = create_course(db, instructor, 1)
+
+    response = client.get(f"/courses/{course.id}/analytics", headers=other_headers)
+
+    assert response.status_code == 403
+
+@pytest.mark.benchmark
+def test_course_analytics_latency_with_100k_students(client, db, make_user):
+    instructor, instructor_headers = make_user("teacher", is_instructor=True)
+    course, lesson_ids = create_course(db, instructor, 10)
+    student_count = 100000
+    db.execute(database.User.__table__.insert(), [
+        {"email": f"s{n}@example.com", "username": f"s{n}", "full_name": "Student", "hashed_password": "x"}
+        for n in range(student_count)
+    ])
+    student_ids = [user_id for (user_id,) in db.query(database.User.id).filter(database.User.id != instructor.id)]
+    start_day = datetime.utcnow() - timedelta(days=100)
+    db.execute(database.user_course_association.insert(), [
+        {"user_id": user_id, "course_id": course.id, "enrolled_at": start_day + timedelta(days=n % 100)}
+        for n, user_id in enumerate(student_ids)
+    ])
+    # Completion drops off along the course: student n finishes the first n % 11 lessons
+    db.execute(database.LessonProgress.__table__.insert(), [
+        {"user_id": user_id, "lesson_id": lesson_id, "is_completed": True, "watched_duration": n % 600}
+        for n, user_id in enumerate(student_ids)
+        for lesson_id in lesson_ids[:n % 11]
+    ])
+    db.commit()
+
+    start = time.perf_counter()
+    response = client.get(f"/courses/{course.id}/analytics", headers=instructor_headers)
+    cold = time.perf_counter() - start
+    start = time.perf_counter()
+    client.get(f"/courses/{course.id}/analytics", headers=instructor_headers)
+    cached = time.perf_counter() - start
+
+    assert response.status_code == 200
+    data = response.json()
+    assert data["total_students"] == student_count
+    assert len(data["enrollment_over_time"]) == 100
+    assert data["funnel"][0]["students"] == sum(1 for n in range(student_count) if n % 11)
+    assert cold < ANALYTICS_LATENCY_TARGET_SECONDS
+    assert cached < CACHED_ANALYTICS_LATENCY_TARGET_SECONDS
+
+def test_existing_database_is_upgraded(tmp_path, make_user):
+    # Schema as created before enrolled_at and the lesson_progress indexes existed
+    legacy_engine = create_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+    database.Base.metadata.create_all(bind=legacy_engine)
+    with legacy_engine.begin() as connection:
+        connection.execute(text("DROP TABLE user_courses"))
+        connection.execute(text(
+            "CREATE TABLE user_courses (user_id INTEGER NOT NULL, course_id INTEGER NOT NULL, "
+            "PRIMARY KEY (user_id, course_id))"
+        ))
+        connection.execute(text("DROP INDEX ix_lesson_progress_user_id"))
+        connection.execute(text("DROP INDEX ix_lesson_progress_lesson_id"))
+        connection.execute(text("INSERT INTO user_courses (user_id, course_id) VALUES (1, 1)"))
+
+    database.upgrade_existing_tables(bind=legacy_engine)
+    database.upgrade_existing_tables(bind=legacy_engine)
+
+    inspector = inspect(legacy_engine)
+    assert "enrolled_at" in {column["name"] for column in inspector.get_columns("user_courses")}
+    assert {"ix_lesson_progress_user_id", "ix_lesson_progress_lesson_id"} <= \
+        {index["name"] for index in inspector.get_indexes("lesson_progress")}
+    with legacy_engine.connect() as connection:
+        assert connection.execute(text("SELECT count(*) FROM user_courses")).scalar() == 1
@@ -0,0 +1,136 @@
+import asyncio
+import time
+from datetime import datetime, timedelta
+import httpx
+import pytest
+from app import database, auth
+from app.main import app
+from conftest import TEST_PASSWORD
+
+def login(client, username):
+    response = client.post("/auth/token", data={"username": username, "password": TEST_PASSWORD})
+    assert response.status_code == 200
+    return response.json()
+
+def refresh(client, refresh_token):
+    return client.post("/auth/refresh", json={"refresh_token": refresh_token})
+
+def test_refresh_rotates_token(client, make_user, monkeypatch):
+    monkeypatch.setattr(auth, "REFRESH_TOKEN_REUSE_GRACE", timedelta(0))
+    make_user("alice")
+    tokens = login(client, "alice")
+
+    response = refresh(client, tokens["refresh_token"])
+
+    assert response.status_code == 200
+    renewed = response.json()
+    assert renewed["refresh_token"] != tokens["refresh_token"]
+    me = client.get("/auth/me", headers={"Authorization": f"Bearer {renewed['access_token']}"})
+    assert me.json()["username"] == "alice"
+    assert refresh(client, tokens["refresh_token"]).status_code == 401
+
+def test_replayed_token_revokes_token_family(client, make_user, monkeypatch):
+    monkeypatch.setattr(auth, "REFRESH_TOKEN_REUSE_GRACE", timedelta(0))
+    make_user("alice")
+    stolen = login(client, "alice")["refresh_token"]
+    current = refresh(client, stolen).json()["refresh_token"]
+    other_session = login(client, "alice")["refresh_token"]
+
+    # Replay is caught by the in-process rotated set and must still revoke the family
+    assert refresh(client, stolen).status_code == 401
+    assert refresh(client, current).status_code == 401
+    assert refresh(client, other_session).status_code == 401
+
+def test_replayed_token_revokes_token_family_in_other_process(client, make_user, monkeypatch):
+    monkeypatch.setattr(auth, "REFRESH_TOKEN_REUSE_GRACE", timedelta(0))
+    make_user("alice")
+    stolen = login(client, "alice")["refresh_token"]
+    current = refresh(client, stolen).json()["refresh_token"]
+    # A worker that never saw the rotation has only the database to go on
+    auth._revoked_refresh_tokens.clear()
+
+    assert refresh(client, stolen).status_code == 401
+    assert refresh(client, current).status_code == 401
+
+def test_concurrent_refreshes_with_same_token_keep_sessions(client, make_user):
+    make_user("alice")
+    shared = login(client, "alice")["refresh_token"]
+    other_session = login(client, "alice")["refresh_token"]
+
+    async def refresh_from_two_tabs():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as async_client:
+            return await asyncio.gather(*[
+                async_client.post("/auth/refresh", json={"refresh_token": shared}) for _ in range(2)
+            ])
+
+    responses = asyncio.run(refresh_from_two_tabs())
+    # A third tab arriving a moment later, after the rotation has committed
+    late = refresh(client, shared)
+
+    assert [response.status_code for response in responses] == [200, 200]
+    assert late.status_code == 200
+    renewed = {response.json()["refresh_token"] for response in responses + [late]}
+    assert len(renewed) == 3
+    for token in renewed:
+        assert refresh(client, token).status_code == 200
+    assert refresh(client, other_session).status_code == 200
+
+def test_logout_revokes_refresh_token(client, make_user):
+    make_user("alice")
+    tokens = login(client, "alice")
+
+    assert client.post("/auth/logout", json={"refresh_token": tokens["refresh_token"]}).status_code == 200
+    assert refresh(client, tokens["refresh_token"]).status_code == 401
+
+def test_reused_logged_out_token_keeps_other_sessions(client, make_user, monkeypatch):
+    monkeypatch.setattr(auth, "REFRESH_TOKEN_REUSE_GRACE", timedelta(0))
+    make_user("alice")
+    logged_out = login(client, "alice")["refresh_token"]
+    other_session = login(client, "alice")["refresh_token"]
+    client.post("/auth/logout", json={"refresh_token": logged_out})
+
+    assert refresh(client, logged_out).status_code == 401
+    assert client.post("/auth/logout", json={"refresh_token": logged_out}).status_code == 200
+    assert refresh(client, other_session).status_code == 200
+
+def test_stale_refresh_tokens_are_pruned(client, db, make_user):
+    user, _ = make_user("alice")
+    now = datetime.utcnow()
+    db.add_all([
+        database.RefreshToken(user_id=user.id, token_hash="expired", expires_at=now - timedelta(minutes=1)),
+        database.RefreshToken(user_id=user.id, token_hash="rotated-long-ago", expires_at=now + timedelta(days=1),
+                              revoked_at=now - auth.REVOKED_REFRESH_TOKEN_RETENTION - timedelta(minutes=1)),
+        database.RefreshToken(user_id=user.id, token_hash="rotated-recently", expires_at=now + timedelta(days=1),
+                              revoked_at=now),
+    ])
+    db.commit()
+
+    tokens = login(client, "alice")
+    for _ in range(5):
+        tokens = refresh(client, tokens["refresh_token"]).json()
+
+    hashes = {token_hash for (token_hash,) in db.query(database.RefreshToken.token_hash)}
+    assert "expired" not in hashes
+    assert "rotated-long-ago" not in hashes
+    assert "rotated-recently" in hashes
+    assert len(hashes) == 1 + 6
+
+@pytest.mark.benchmark
+def test_refresh_is_much_cheaper_than_login(client, make_user):
+    make_user("alice")
+    sessions = 10
+
+    start = time.process_time()
+    for _ in range(sessions):
+        tokens = login(client, "alice")
+    login_cpu = time.process_time() - start
+
+    refresh_token = tokens["refresh_token"]
+    start = time.process_time()
+    for _ in range(sessions):
+        refresh_token = refresh(client, refresh_token).json()["refresh_token"]
+    refresh_cpu = time.process_time() - start
+
+    # Renewing a session must avoid bcrypt entirely
+    assert refresh_cpu * 10 < login_cpu
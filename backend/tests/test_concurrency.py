@@ -0,0 +1,101 @@
+import asyncio
+import time
+import httpx
+import pytest
+from anyio import to_thread
+from fastapi import FastAPI
+from app import concurrency
+
+SERVICE_TIME_SECONDS = 0.05
+MAX_CONCURRENT = 4
+CAPACITY_PER_SECOND = MAX_CONCURRENT / SERVICE_TIME_SECONDS
+QUEUE_TIMEOUT_SECONDS = 0.5
+
+@pytest.fixture
+def slow_app(monkeypatch):
+    monkeypatch.setitem(concurrency.limiters, "read", concurrency.RouteClassLimiter(
+        "read", MAX_CONCURRENT, 2 * MAX_CONCURRENT, QUEUE_TIMEOUT_SECONDS
+    ))
+    app = FastAPI()
+    app.add_middleware(concurrency.ConcurrencyLimitMiddleware)
+
+    @app.get("/slow")
+    def slow():
+        time.sleep(SERVICE_TIME_SECONDS)
+        return {}
+
+    return app
+
+@pytest.mark.parametrize("method, path, route_class", [
+    ("POST", "/auth/token", "auth"),
+    ("POST", "/auth/register", "auth"),
+    ("POST", "/auth/refresh", "write"),
+    ("POST", "/auth/logout", "write"),
+    ("GET", "/auth/me", "read"),
+    ("GET", "/courses/", "read"),
+    ("PUT", "/lessons/1", "write"),
+])
+def test_route_classes(method, path, route_class):
+    assert concurrency.get_route_class(method, path) == route_class
+
+def test_threadpool_holds_every_admitted_request(slow_app, monkeypatch):
+    # More than anyio's default of 40 threads
+    monkeypatch.setitem(concurrency.limiters, "write", concurrency.RouteClassLimiter("write", 64, 0, 1))
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=slow_app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            await client.get("/slow")
+        return to_thread.current_default_thread_limiter().total_tokens
+
+    admitted = sum(limiter.max_concurrent for limiter in concurrency.limiters.values())
+    assert asyncio.run(scenario()) >= admitted + concurrency.THREADPOOL_HEADROOM
+
+def test_burst_beyond_queue_is_shed_immediately(slow_app):
+    async def scenario():
+        transport = httpx.ASGITransport(app=slow_app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await asyncio.gather(*[client.get("/slow") for _ in range(100)])
+
+    responses = asyncio.run(scenario())
+
+    admitted = [response for response in responses if response.status_code == 200]
+    shed = [response for response in responses if response.status_code == 503]
+    assert len(admitted) == 3 * MAX_CONCURRENT
+    assert len(shed) == 100 - len(admitted)
+    assert all(int(response.headers["Retry-After"]) >= 1 for response in shed)
+    stats = concurrency.get_load_stats()["read"]
+    assert stats["rejected_queue_full"] == len(shed)
+    assert stats["active"] == 0 and stats["queued"] == 0
+
+@pytest.mark.benchmark
+def test_goodput_stays_near_capacity_under_overload(slow_app):
+    duration = 2.0
+    arrival_rate = 2 * CAPACITY_PER_SECOND
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=slow_app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            async def timed_request():
+                start = time.perf_counter()
+                response = await client.get("/slow")
+                return response.status_code, time.perf_counter() - start
+
+            tasks = []
+            start = time.perf_counter()
+            # Open-loop arrivals at twice the capacity, regardless of how fast responses come back
+            while time.perf_counter() - start < duration:
+                tasks.append(asyncio.create_task(timed_request()))
+                await asyncio.sleep(1 / arrival_rate)
+            results = await asyncio.gather(*tasks)
+            return results, time.perf_counter() - start
+
+    results, elapsed = asyncio.run(scenario())
+
+    succeeded = [latency for status, latency in results if status == 200]
+    shed = [latency for status, latency in results if status == 503]
+    assert len(succeeded) + len(shed) == len(results)
+    assert len(succeeded) / elapsed > 0.8 * CAPACITY_PER_SECOND
+    # Admitted requests never wait longer than the queue deadline
+    assert max(succeeded) < QUEUE_TIMEOUT_SECONDS + 2 * SERVICE_TIME_SECONDS
+    assert shed
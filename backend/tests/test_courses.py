@@ -0,0 +1,94 @@
+from sqlalchemy import func
+from app import database
+
+LESSONS_PER_COURSE = 4
+
+def seed_enrolled_courses(db, instructor, student, course_count):
+    """Enroll the student in course_count published courses; course i has i % 5 lessons completed."""
+    first_new_id = (db.query(func.max(database.Course.id)).scalar() or 0) + 1
+    db.execute(database.Course.__table__.insert(), [
+        {"title": f"Course {n}", "is_published": True, "instructor_id": instructor.id}
+        for n in range(course_count)
+    ])
+    course_ids = [course_id for (course_id,) in db.query(database.Course.id)
+                  .filter(database.Course.id >= first_new_id).order_by(database.Course.id)]
+    db.execute(database.user_course_association.insert(), [
+        {"user_id": student.id, "course_id": course_id} for course_id in course_ids
+    ])
+    lessons = []
+    for course_id in course_ids:
+        lessons += [
+            {"title": f"Lesson {n}", "course_id": course_id, "order_index": n + 1, "is_published": True}
+            for n in range(LESSONS_PER_COURSE)
+        ]
+        # Unpublished lessons are not part of a student's progress
+        lessons.append({"title": "Draft", "course_id": course_id, "order_index": 99, "is_published": False})
+    db.execute(database.Lesson.__table__.insert(), lessons)
+
+    progress = []
+    for index, course_id in enumerate(course_ids):
+        lesson_ids = [lesson_id for (lesson_id,) in db.query(database.Lesson.id)
+                      .filter(database.Lesson.course_id == course_id, database.Lesson.is_published == True)
+                      .order_by(database.Lesson.order_index)]
+        completed = index % 5
+        progress += [
+            {"user_id": student.id, "lesson_id": lesson_id, "is_completed": n < completed}
+            for n, lesson_id in enumerate(lesson_ids[:min(completed + 1, LESSONS_PER_COURSE)])
+        ]
+    db.execute(database.LessonProgress.__table__.insert(), progress)
+    db.commit()
+    return course_ids
+
+def test_enrolled_courses_include_progress(client, db, make_user):
+    instructor, _ = make_user("teacher", is_instructor=True)
+    student, headers = make_user("student")
+    course_ids = seed_enrolled_courses(db, instructor, student, 300)
+
+    response = client.get("/courses/my/enrolled", headers=headers)
+
+    assert response.status_code == 200
+    courses = {course["id"]: course for course in response.json()}
+    assert len(courses) == 300
+    for index, course_id in enumerate(course_ids):
+        completed = min(index % 5, LESSONS_PER_COURSE)
+        course = courses[course_id]
+        assert course["student_count"] == 1
+        assert course["total_lessons"] == LESSONS_PER_COURSE
+        assert course["completed_lessons"] == completed
+        assert course["progress_percent"] == completed * 100 // LESSONS_PER_COURSE
+
+def test_almost_complete_course_is_not_reported_complete(client, db, make_user):
+    instructor, _ = make_user("teacher", is_instructor=True)
+    student, headers = make_user("student")
+    course = database.Course(title="Course", is_published=True, instructor_id=instructor.id)
+    db.add(course)
+    db.commit()
+    db.execute(database.user_course_association.insert(), {"user_id": student.id, "course_id": course.id})
+    db.execute(database.Lesson.__table__.insert(), [
+        {"title": f"Lesson {n}", "course_id": course.id, "order_index": n + 1, "is_published": True}
+        for n in range(200)
+    ])
+    lesson_ids = [lesson_id for (lesson_id,) in db.query(database.Lesson.id).order_by(database.Lesson.id)]
+    db.execute(database.LessonProgress.__table__.insert(), [
+        {"user_id": student.id, "lesson_id": lesson_id, "is_completed": True} for lesson_id in lesson_ids[:199]
+    ])
+    db.commit()
+
+    (enrolled,) = client.get("/courses/my/enrolled", headers=headers).json()
+
+    assert enrolled["completed_lessons"] == 199
+    assert enrolled["progress_percent"] == 99
+
+def test_enrolled_courses_query_count_is_constant(client, db, make_user, count_queries):
+    instructor, _ = make_user("teacher", is_instructor=True)
+    few_student, few_headers = make_user("few")
+    many_student, many_headers = make_user("many")
+    seed_enrolled_courses(db, instructor, few_student, 5)
+    seed_enrolled_courses(db, instructor, many_student, 500)
+
+    few, few_queries = count_queries(lambda: client.get("/courses/my/enrolled", headers=few_headers))
+    many, many_queries = count_queries(lambda: client.get("/courses/my/enrolled", headers=many_headers))
+
+    assert len(few.json()) == 5
+    assert len(many.json()) == 500
+    assert many_queries == few_queries
@@ -0,0 +1,131 @@
+import time
+import pytest
+from app import database
+from app.routers.courses import MAX_BULK_LESSONS
+
+BULK_COURSE_LESSONS = 500
+# A 500-lesson course must be created, edited and reordered in well under a second each
+BULK_LATENCY_TARGET_SECONDS = 1.0
+SINGLE_CREATE_SAMPLE = 20
+
+def create_course(db, instructor):
+    course = database.Course(title="Course", is_published=True, instructor_id=instructor.id)
+    db.add(course)
+    db.commit()
+    return course.id
+
+def new_lessons(count):
+    return [{"title": f"Lesson {n}", "order_index": n + 1, "is_published": True} for n in range(count)]
+
+def test_bulk_create_and_update(client, db, make_user):
+    instructor, headers = make_user("teacher", is_instructor=True)
+    course_id = create_course(db, instructor)
+    created = client.post(f"/courses/{course_id}/lessons:bulk", json={"create": new_lessons(2)}, headers=headers)
+    first, second = created.json()
+
+    response = client.post(f"/courses/{course_id}/lessons:bulk", json={
+        "create": [{"title": "Lesson 3", "order_index": 3}],
+        "update": [{"id": first["id"], "title": "Intro"}, {"id": second["id"], "is_published": False}],
+    }, headers=headers)
+
+    assert response.status_code == 200
+    lessons = {lesson["title"]: lesson for lesson in response.json()}
+    assert set(lessons) == {"Intro", "Lesson 1", "Lesson 3"}
+    assert lessons["Intro"]["is_published"] is True
+    assert lessons["Lesson 1"]["is_published"] is False
+
+def test_bulk_create_appends_lessons_without_position(client, db, make_user):
+    instructor, headers = make_user("teacher", is_instructor=True)
+    course_id = create_course(db, instructor)
+    client.post(f"/courses/{course_id}/lessons:bulk", json={"create": new_lessons(2)}, headers=headers)
+
+    response = client.post(f"/courses/{course_id}/lessons:bulk", json={"create": [
+        {"title": "Appended 1"}, {"title": "Placed", "order_index": 5}, {"title": "Appended 2"},
+    ]}, headers=headers)
+
+    assert response.status_code == 200
+    positions = {lesson["title"]: lesson["order_index"] for lesson in response.json()}
+    assert positions == {"Placed": 5, "Appended 1": 6, "Appended 2": 7}
+
+def test_bulk_update_rejects_null_for_required_fields(client, db, make_user):
+    instructor, headers = make_user("teacher", is_instructor=True)
+    course_id = create_course(db, instructor)
+    (lesson,) = client.post(f"/courses/{course_id}/lessons:bulk", json={"create": new_lessons(1)},
+                            headers=headers).json()
+
+    for field in ("title", "order_index", "is_published"):
+        response = client.post(f"/courses/{course_id}/lessons:bulk",
+                               json={"update": [{"id": lesson["id"], field: None}]}, headers=headers)
+        assert response.status_code == 422, field
+
+    # Nullable fields can still be cleared
+    response = client.post(f"/courses/{course_id}/lessons:bulk",
+                           json={"update": [{"id": lesson["id"], "video_url": None}]}, headers=headers)
+    assert response.status_code == 200
+
+def test_bulk_request_size_is_capped(client, db, make_user):
+    instructor, headers = make_user("teacher", is_instructor=True)
+    course_id = create_course(db, instructor)
+
+    response = client.post(f"/courses/{course_id}/lessons:bulk",
+                           json={"create": new_lessons(MAX_BULK_LESSONS + 1)}, headers=headers)
+
+    assert response.status_code == 400
+    assert db.query(database.Lesson).count() == 0
+
+@pytest.mark.benchmark
+def test_bulk_authoring_throughput(client, db, make_user):
+    instructor, headers = make_user("teacher", is_instructor=True)
+    course_id = create_course(db, instructor)
+
+    start = time.perf_counter()
+    created = client.post(f"/courses/{course_id}/lessons:bulk",
+                          json={"create": new_lessons(BULK_COURSE_LESSONS)}, headers=headers)
+    create_seconds = time.perf_counter() - start
+    lesson_ids = [lesson["id"] for lesson in created.json()]
+
+    start = time.perf_counter()
+    updated = client.post(f"/courses/{course_id}/lessons:bulk", json={
+        "update": [{"id": lesson_id, "title": f"Renamed {lesson_id}"} for lesson_id in lesson_ids]
+    }, headers=headers)
+    update_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    reordered = client.put(f"/courses/{course_id}/lessons/order",
+                           json={"lesson_ids": lesson_ids[::-1]}, headers=headers)
+    reorder_seconds = time.perf_counter() - start
+
+    single_course_id = create_course(db, instructor)
+    start = time.perf_counter()
+    for lesson in new_lessons(SINGLE_CREATE_SAMPLE):
+        client.post("/lessons/", json={**lesson, "course_id": single_course_id}, headers=headers)
+    single_seconds_per_lesson = (time.perf_counter() - start) / SINGLE_CREATE_SAMPLE
+
+    assert len(lesson_ids) == BULK_COURSE_LESSONS
+    assert updated.status_code == 200 and reordered.status_code == 200
+    assert create_seconds < BULK_LATENCY_TARGET_SECONDS
+    assert update_seconds < BULK_LATENCY_TARGET_SECONDS
+    assert reorder_seconds < BULK_LATENCY_TARGET_SECONDS
+    assert create_seconds / BULK_COURSE_LESSONS * 5 < single_seconds_per_lesson
+
+def test_reorder_uses_one_based_positions(client, db, make_user):
+    instructor, headers = make_user("teacher", is_instructor=True)
+    course_id = create_course(db, instructor)
+    lesson_ids = [lesson["id"] for lesson in client.post(
+        f"/courses/{course_id}/lessons:bulk", json={"create": new_lessons(3)}, headers=headers).json()]
+
+    response = client.put(f"/courses/{course_id}/lessons/order",
+                          json={"lesson_ids": lesson_ids[::-1]}, headers=headers)
+
+    assert response.status_code == 200
+    assert [(lesson["id"], lesson["order_index"]) for lesson in response.json()] == \
+        list(zip(lesson_ids[::-1], [1, 2, 3]))
+
+def test_reorder_requires_course_owner(client, db, make_user):
+    instructor, _ = make_user("teacher", is_instructor=True)
+    _, other_headers = make_user("other", is_instructor=True)
+    course_id = create_course(db, instructor)
+
+    response = client.put(f"/courses/{course_id}/lessons/order", json={"lesson_ids": []}, headers=other_headers)
+
+    assert response.status_code == 403
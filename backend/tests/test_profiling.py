@@ -0,0 +1,113 @@
+import time
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from app import profiling
+from app.routers import profiling as profiling_router
+
+TOKEN = "secret-token"
+SLOW_SECONDS = 0.1
+
+def slow_handler():
+    time.sleep(SLOW_SECONDS)
+    return {}
+
+@pytest.fixture
+def profiled_client(monkeypatch):
+    monkeypatch.setattr(profiling, "PROFILING_TOKEN", TOKEN)
+    app = FastAPI()
+    app.add_middleware(profiling.ProfilingMiddleware)
+    app.include_router(profiling_router.router)
+    app.get("/slow")(slow_handler)
+    app.get("/fast")(lambda: {})
+    return TestClient(app)
+
+@pytest.fixture
+def sampler_starts(monkeypatch):
+    starts = []
+    original = profiling._start_sampler
+
+    def counting_start_sampler():
+        starts.append(True)
+        return original()
+
+    monkeypatch.setattr(profiling, "_start_sampler", counting_start_sampler)
+    return starts
+
+def test_profiles_require_valid_token(profiled_client):
+    assert profiled_client.get("/debug/profiles").status_code == 403
+    assert profiled_client.get("/debug/profiles", headers={"X-Profile-Token": "wrong"}).status_code == 403
+    assert profiled_client.delete("/debug/profiles").status_code == 403
+    assert profiled_client.get("/debug/profiles", headers={"X-Profile-Token": TOKEN}).status_code == 200
+
+def test_profiles_forbidden_when_no_token_configured(profiled_client, monkeypatch):
+    monkeypatch.setattr(profiling, "PROFILING_TOKEN", "")
+
+    assert profiled_client.get("/debug/profiles", headers={"X-Profile-Token": ""}).status_code == 403
+
+def test_on_demand_profile(profiled_client):
+    response = profiled_client.get("/slow", headers={"X-Profile": "1", "X-Profile-Token": TOKEN})
+
+    profile_id = response.headers["X-Profile-Id"]
+    profile = profiled_client.get(f"/debug/profiles/{profile_id}", headers={"X-Profile-Token": TOKEN}).json()
+    assert profile["trigger"] == "on_demand"
+    assert profile["path"] == "/slow"
+    assert profile["status_code"] == 200
+    assert profile["sample_count"] > 0
+    assert any("slow_handler" in function["function"] for function in profile["top_functions"])
+
+def test_invalid_token_does_not_profile(profiled_client, sampler_starts):
+    response = profiled_client.get("/slow?profile=1", headers={"X-Profile-Token": "wrong"})
+
+    assert response.status_code == 200
+    assert "X-Profile-Id" not in response.headers
+    assert sampler_starts == []
+    assert profiling.list_profiles() == []
+
+def test_disabled_profiling_passes_through(profiled_client, sampler_starts, monkeypatch):
+    monkeypatch.setattr(profiling, "PROFILING_TOKEN", "")
+    monkeypatch.setattr(profiling, "SLOW_REQUEST_THRESHOLD_MS", 0)
+
+    response = profiled_client.get("/slow", headers={"X-Profile": "1", "X-Profile-Token": ""})
+
+    assert response.status_code == 200
+    assert "X-Profile-Id" not in response.headers
+    assert sampler_starts == []
+
+def test_ring_buffer_keeps_latest_profiles(profiled_client):
+    assert profiling._profiles.maxlen == profiling.PROFILE_BUFFER_SIZE
+    profile_ids = [
+        profiled_client.get("/fast", headers={"X-Profile": "1", "X-Profile-Token": TOKEN}).headers["X-Profile-Id"]
+        for _ in range(profiling.PROFILE_BUFFER_SIZE + 5)
+    ]
+
+    listed = profiled_client.get("/debug/profiles", headers={"X-Profile-Token": TOKEN}).json()
+
+    # Newest first, oldest evicted
+    assert [profile["id"] for profile in listed] == profile_ids[:4:-1]
+    assert profiled_client.get(f"/debug/profiles/{profile_ids[0]}",
+                               headers={"X-Profile-Token": TOKEN}).status_code == 404
+
+def test_slow_request_captured(profiled_client, monkeypatch):
+    monkeypatch.setattr(profiling, "SLOW_REQUEST_THRESHOLD_MS", 20)
+
+    fast = profiled_client.get("/fast")
+    slow = profiled_client.get("/slow")
+
+    assert "X-Profile-Id" not in fast.headers
+    (profile,) = profiling.list_profiles()
+    assert profile["trigger"] == "slow_request"
+    assert profile["path"] == "/slow"
+    assert profile["duration_ms"] >= SLOW_SECONDS * 1000
+    assert profile["sample_count"] > 0
+    assert slow.status_code == 200
+
+def test_slow_request_without_samples_is_not_stored(profiled_client, monkeypatch):
+    monkeypatch.setattr(profiling, "SLOW_REQUEST_THRESHOLD_MS", 1)
+    # The request finishes long before the first sample is due
+    monkeypatch.setattr(profiling, "PROFILE_SAMPLE_INTERVAL_MS", 10000)
+
+    assert profiled_client.get("/slow").status_code == 200
+
+    assert profiling.list_profiles() == []
+    assert profiling._active_samplers == 0
@@ -0,0 +1,150 @@
+import asyncio
+import os
+import statistics
+import threading
+import time
+import httpx
+import pytest
+from app import auth, concurrency, database, rate_limit
+from app.main import app
+
+@pytest.fixture
+def verify_calls(monkeypatch):
+    calls = []
+    original = auth.verify_password
+
+    def counting_verify_password(plain_password, hashed_password):
+        calls.append(plain_password)
+        return original(plain_password, hashed_password)
+
+    monkeypatch.setattr(auth, "verify_password", counting_verify_password)
+    return calls
+
+def attempt_login(client, username, password="wrong"):
+    return client.post("/auth/token", data={"username": username, "password": password})
+
+def test_login_throttled_per_username_before_hashing(client, make_user, monkeypatch, verify_calls):
+    make_user("alice")
+    monkeypatch.setattr(rate_limit, "LOGIN_RATE_LIMIT_PER_USERNAME", "3/60")
+
+    statuses = [attempt_login(client, "alice").status_code for _ in range(3)]
+    throttled = attempt_login(client, "alice")
+
+    assert statuses == [401, 401, 401]
+    assert throttled.status_code == 429
+    assert int(throttled.headers["Retry-After"]) > 0
+    assert len(verify_calls) == 3
+    # Other accounts are not affected by alice's bucket
+    assert attempt_login(client, "bob").status_code == 401
+
+def test_login_throttled_per_ip(client, make_user, monkeypatch, verify_calls):
+    make_user("alice")
+    monkeypatch.setattr(rate_limit, "LOGIN_RATE_LIMIT_PER_IP", "2/60")
+
+    statuses = [attempt_login(client, f"user{n}").status_code for n in range(4)]
+
+    assert statuses == [401, 401, 429, 429]
+    assert len(verify_calls) == 0  # unknown users never reach bcrypt
+
+def test_register_throttled_per_ip(client, monkeypatch):
+    monkeypatch.setattr(rate_limit, "REGISTER_RATE_LIMIT_PER_IP", "1/60")
+    payload = {"email": "new@example.com", "username": "new", "full_name": "New", "password": "pw"}
+
+    assert client.post("/auth/register", json=payload).status_code == 200
+    response = client.post("/auth/register", json={**payload, "email": "other@example.com", "username": "other"})
+
+    assert response.status_code == 429
+    assert "Retry-After" in response.headers
+
+def test_bucket_refills():
+    backend = rate_limit.InMemoryRateLimitBackend()
+
+    assert backend.consume("key", 1, 100) is None
+    assert backend.consume("key", 1, 100) is not None
+    time.sleep(0.02)
+    assert backend.consume("key", 1, 100) is None
+
+def test_database_backend_shared_across_concurrent_workers():
+    capacity = 30
+    backends = [rate_limit.DatabaseRateLimitBackend() for _ in range(8)]
+    results = []
+    results_lock = threading.Lock()
+
+    def worker(backend):
+        for _ in range(25):
+            # Refill is negligible, so no more than capacity tokens may ever be handed out
+            allowed = backend.consume("login:user:alice", capacity, 1e-9) is None
+            with results_lock:
+                results.append(allowed)
+
+    threads = [threading.Thread(target=worker, args=(backend,)) for backend in backends]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(results) == 200
+    assert sum(results) == capacity
+
+def test_database_backend_prunes_refilled_buckets(db):
+    backend = rate_limit.DatabaseRateLimitBackend()
+    # A credential-stuffing run touching many distinct keys once each
+    for n in range(50):
+        assert backend.consume(f"login:user:random{n}", 10, 100) is None
+    backend.consume("login:user:alice", 10, 1e-9)
+    time.sleep(0.1)
+
+    backend._next_prune = 0
+    backend.consume("login:user:bob", 10, 100)
+
+    keys = {key for (key,) in db.query(database.RateLimitBucket.key)}
+    assert keys == {"login:user:alice", "login:user:bob"}
+
+@pytest.mark.benchmark
+def test_unrelated_latency_steady_under_auth_flood(make_user, monkeypatch):
+    make_user("alice")
+    monkeypatch.setattr(rate_limit, "LOGIN_RATE_LIMIT_PER_IP", "5/60")
+    # One auth slot per core, so the flood can't take the CPU from other route classes
+    monkeypatch.setitem(concurrency.limiters, "auth", concurrency.RouteClassLimiter(
+        "auth", os.cpu_count() or 1, concurrency.AUTH_QUEUE_LIMIT, concurrency.REQUEST_QUEUE_TIMEOUT_SECONDS
+    ))
+
+    async def scenario():
+        # One event loop with sync handlers on the threadpool, as under uvicorn
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            async def median_latency(samples=30):
+                timings = []
+                for _ in range(samples):
+                    start = time.perf_counter()
+                    response = await client.get("/courses/")
+                    assert response.status_code == 200
+                    timings.append(time.perf_counter() - start)
+                return statistics.median(timings)
+
+            baseline = await median_latency()
+
+            stop = asyncio.Event()
+            flood_statuses = []
+
+            async def flood():
+                while not stop.is_set():
+                    response = await client.post("/auth/token", data={"username": "alice", "password": "wrong"})
+                    flood_statuses.append(response.status_code)
+
+            flooders = [asyncio.create_task(flood()) for _ in range(8)]
+            # Wait until the allowance is spent and the flood is being rejected
+            while 429 not in flood_statuses:
+                await asyncio.sleep(0.01)
+            rejected_before = flood_statuses.count(429)
+            under_flood = await median_latency()
+            rejected_during = flood_statuses.count(429) - rejected_before
+            stop.set()
+            await asyncio.gather(*flooders)
+            return baseline, under_flood, rejected_during, flood_statuses
+
+    baseline, under_flood, rejected_during, flood_statuses = asyncio.run(scenario())
+
+    assert rejected_during > 30
+    assert flood_statuses.count(401) == 5
+    assert under_flood < baseline * 3 + 0.01
@@ -0,0 +1,105 @@
+import asyncio
+import httpx
+import pytest
+from app import database, recommendations
+from app.main import app
+
+def create_courses(db, instructor, count):
+    courses = [database.Course(title=f"Course {n}", is_published=True, instructor_id=instructor.id)
+               for n in range(count)]
+    db.add_all(courses)
+    db.commit()
+    return [course.id for course in courses]
+
+def matrix(db):
+    return {(row.course_id, row.related_course_id): row.student_count
+            for row in db.query(database.CourseCoEnrollment)}
+
+def test_incremental_updates_match_rebuild(client, db, make_user):
+    instructor, _ = make_user("teacher", is_instructor=True)
+    course_ids = create_courses(db, instructor, 4)
+    for n in range(6):
+        _, headers = make_user(f"student{n}")
+        for course_id in course_ids[:2 + n % 3]:
+            assert client.post(f"/courses/{course_id}/enroll", headers=headers).status_code == 200
+
+    incremental = matrix(db)
+    recommendations.rebuild_co_enrollments(db)
+    db.expire_all()
+
+    assert incremental == matrix(db)
+    assert incremental[(course_ids[0], course_ids[1])] == 6
+
+def test_related_courses(client, db, make_user):
+    instructor, _ = make_user("teacher", is_instructor=True)
+    first, second, third = create_courses(db, instructor, 3)
+    for n in range(3):
+        _, headers = make_user(f"student{n}")
+        client.post(f"/courses/{first}/enroll", headers=headers)
+        client.post(f"/courses/{second if n else third}/enroll", headers=headers)
+
+    response = client.get(f"/courses/{first}/related")
+
+    assert response.status_code == 200
+    assert [(course["id"], course["co_enrolled_students"]) for course in response.json()] == \
+        [(second, 2), (third, 1)]
+
+def enroll_concurrently(enrollments):
+    """POST every (course_id, headers) enrollment at once on a single event loop."""
+    async def scenario():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await asyncio.gather(*[
+                client.post(f"/courses/{course_id}/enroll", headers=headers) for course_id, headers in enrollments
+            ])
+    return [response.status_code for response in asyncio.run(scenario())]
+
+def test_concurrent_enrollments_by_one_user_count_pair_once(db, make_user):
+    instructor, _ = make_user("teacher", is_instructor=True)
+    first, second = create_courses(db, instructor, 2)
+    _, headers = make_user("student")
+
+    assert enroll_concurrently([(first, headers), (second, headers)]) == [200, 200]
+
+    assert matrix(db) == {(first, second): 1, (second, first): 1}
+
+def test_concurrent_enrollments_into_same_pair(client, db, make_user):
+    instructor, _ = make_user("teacher", is_instructor=True)
+    first, second = create_courses(db, instructor, 2)
+    students = [make_user(f"student{n}")[1] for n in range(6)]
+    for headers in students:
+        client.post(f"/courses/{first}/enroll", headers=headers)
+
+    # Every enrollment creates or increments the same two rows
+    assert enroll_concurrently([(second, headers) for headers in students]) == [200] * 6
+
+    assert matrix(db) == {(first, second): 6, (second, first): 6}
+
+def test_enrollment_and_matrix_update_commit_together(client, db, make_user, monkeypatch):
+    instructor, _ = make_user("teacher", is_instructor=True)
+    (course_id,) = create_courses(db, instructor, 1)
+    student, headers = make_user("student")
+
+    def failing_record_enrollment(session, user_id, course_id):
+        raise RuntimeError("matrix update failed")
+
+    monkeypatch.setattr(recommendations, "record_enrollment", failing_record_enrollment)
+    with pytest.raises(RuntimeError):
+        client.post(f"/courses/{course_id}/enroll", headers=headers)
+
+    assert db.query(database.user_course_association).filter_by(user_id=student.id).count() == 0
+
+def test_initial_build_covers_existing_enrollments(db, make_user):
+    instructor, _ = make_user("teacher", is_instructor=True)
+    first, second = create_courses(db, instructor, 2)
+    student, _ = make_user("student")
+    # Enrollments written before the matrix existed
+    db.execute(database.user_course_association.insert(), [
+        {"user_id": student.id, "course_id": first},
+        {"user_id": student.id, "course_id": second},
+    ])
+    db.commit()
+
+    recommendations.build_co_enrollments_if_missing()
+
+    assert matrix(db) == {(first, second): 1, (second, first): 1}
@@ -19,12 +19,51 @@ api.interceptors.request.use((config) => {
   return config
 })
 
+// Exchange the refresh token for a new token pair, sharing one request between concurrent callers
+let refreshPromise: Promise<string | null> | null = null
+
+const refreshAccessToken = () => {
+  const refreshToken = Cookies.get('refresh_token')
+  if (!refreshToken) {
+    return Promise.resolve(null)
+  }
+  if (!refreshPromise) {
+    refreshPromise = axios
+      .post(`${API_BASE_URL}/auth/refresh`, { refresh_token: refreshToken })
+      .then((response) => {
+        const { access_token, refresh_token } = response.data
+        Cookies.set('access_token', access_token, { expires: 7 })
+        Cookies.set('refresh_token', refresh_token, { expires: 30 })
+        return access_token as string
+      })
+      .catch(() => null)
+      .finally(() => {
+        refreshPromise = null
+      })
+  }
+  return refreshPromise
+}
+
 // Handle auth errors
 api.interceptors.response.use(
   (response) => response,
-  (error) => {
+  async (error) => {
+    const originalRequest = error.config
+    if (error.response?.status === 401 && originalRequest && !originalRequest._retry) {
+      originalRequest._retry = true
+      // Another tab may already have refreshed the shared cookies
+      const currentToken = Cookies.get('access_token')
+      const accessToken = currentToken && originalRequest.headers.Authorization !== `Bearer ${currentToken}`
+        ? currentToken
+        : await refreshAccessToken()
+      if (accessToken) {
+        originalRequest.headers.Authorization = `Bearer ${accessToken}`
+        return api(originalRequest)
+      }
+    }
     if (error.response?.status === 401) {
       Cookies.remove('access_token')
+      Cookies.remove('refresh_token')
       window.location.href = '/login'
     }
     return Promise.reject(error)
@@ -42,6 +81,7 @@ export const authAPI = {
     })
   },
   register: (userData: any) => api.post('/auth/register', userData),
+  logout: (refreshToken: string) => api.post('/auth/logout', { refresh_token: refreshToken }),
   getMe: () => api.get('/auth/me'),
 }
 
@@ -1,7 +1,7 @@
 'use client'
 
 import { createContext, useContext, useEffect, useState, ReactNode } from 'react'
-import { api } from '../api'
+import { api, authAPI } from '../api'
 import Cookies from 'js-cookie'
 import { useQueryClient } from 'react-query'
 
@@ -52,6 +52,7 @@ export function AuthProvider({ children }: { children: ReactNode }) {
     } catch (error) {
       console.error('Failed to fetch user:', error)
       Cookies.remove('access_token')
+      Cookies.remove('refresh_token')
       setUser(null) // Clear user state on error
     } finally {
       setIsLoading(false)
@@ -69,8 +70,11 @@ export function AuthProvider({ children }: { children: ReactNode }) {
       },
     })
 
-    const { access_token } = response.data
+    const { access_token, refresh_token } = response.data
     Cookies.set('access_token', access_token, { expires: 7 })
+    if (refresh_token) {
+      Cookies.set('refresh_token', refresh_token, { expires: 30 })
+    }
     
     // Clear any existing cache before fetching new user data
     queryClient.clear()
@@ -90,7 +94,13 @@ export function AuthProvider({ children }: { children: ReactNode }) {
   }
 
   const logout = () => {
+    const refreshToken = Cookies.get('refresh_token')
+    if (refreshToken) {
+      // Revoke the session server-side; logging out locally doesn't wait on it
+      authAPI.logout(refreshToken).catch(() => {})
+    }
     Cookies.remove('access_token')
+    Cookies.remove('refresh_token')
     setUser(null)
     // Clear all React Query cache
     queryClient.clear()